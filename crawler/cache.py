@@ -0,0 +1,98 @@
+"""
+爬蟲檔案快取模組
+將抓取結果以 pickle 存放在本機磁碟，並依存活時間 (TTL) 判斷是否過期
+"""
+import os
+import time
+import pickle
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 快取根目錄，可透過環境變數覆寫
+CACHE_DIR = os.environ.get('CRAWLER_CACHE_DIR', '.cache')
+
+class FileCache:
+    """以檔案修改時間判斷過期的簡易磁碟快取"""
+
+    def __init__(self, name, ttl=3600, cache_dir=None):
+        """
+        Args:
+            name: 快取名稱，作為子目錄名稱
+            ttl: 存活時間（秒）
+            cache_dir: 快取根目錄，預設使用 CACHE_DIR
+        """
+        self.ttl = ttl
+        self.directory = os.path.join(cache_dir or CACHE_DIR, name)
+
+    @staticmethod
+    def make_key(url, data=None):
+        """
+        以網址與查詢參數產生快取鍵
+
+        Args:
+            url: 網址
+            data: 查詢參數字典
+
+        Returns:
+            str: MD5 雜湊字串
+        """
+        raw = url + repr(sorted((data or {}).items()))
+        return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key, ttl=None):
+        """
+        讀取快取值
+
+        Args:
+            key: 快取鍵
+            ttl: 本次讀取使用的存活時間（秒），預設使用建立時的 ttl
+
+        Returns:
+            快取值，不存在或已過期時返回 None
+        """
+        path = self._path(key)
+        if ttl is None:
+            ttl = self.ttl
+        try:
+            if time.time() - os.path.getmtime(path) > ttl:
+                return None
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"讀取快取時出錯: {path}, {str(e)}")
+            return None
+
+    def set(self, key, value):
+        """
+        寫入快取值 (先寫入暫存檔再取代，避免多執行緒讀到不完整的檔案)
+
+        Args:
+            key: 快取鍵
+            value: 可被 pickle 的值
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{id(value)}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"寫入快取時出錯: {path}, {str(e)}")
+
+    def clear(self):
+        """清除此快取的所有檔案"""
+        if not os.path.isdir(self.directory):
+            return
+        for filename in os.listdir(self.directory):
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except OSError as e:
+                logger.warning(f"清除快取檔案時出錯: {filename}, {str(e)}")
@@ -2,15 +2,310 @@
 期貨相關資料爬蟲模組 - 採用相對位置策略的改進版本
 """
 import logging
-import requests
 import re
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
-from .utils import get_tw_stock_date, safe_float, safe_int, get_html_content
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import lxml.etree
+from types import MappingProxyType
+from .utils import get_tw_stock_date, safe_float, safe_int, format_query_date, TAIFEX_BASE_QUERY, is_report_final, ResultCache, fetch_taifex_tree
 from .taiex import get_taiex_data
 
 logger = logging.getLogger(__name__)
 
+# 各報表的請求頭 (共用標頭已設定於 Session，各報表僅 Referer 不同)
+_TX_HEADERS = {'Referer': 'https://www.taifex.com.tw/cht/3/futDailyMarketReport'}
+_INSTITUTIONAL_HEADERS = {'Referer': 'https://www.taifex.com.tw/cht/3/futContractsDate'}
+_TOP_TRADERS_HEADERS = {'Referer': 'https://www.taifex.com.tw/cht/3/largeTraderFutQryTbl'}
+_OPTIONS_HEADERS = {'Referer': 'https://www.taifex.com.tw/cht/3/callsAndPutsDate'}
+
+# 台指期貨每日行情報表的固定查詢參數 (僅日期每次不同)
+_TX_QUERY = {
+    'queryType': '2',  # 期貨報價
+    'marketCode': '0',  # 所有市場
+    'dateaddcnt': '',
+    'commodity_id': 'TX',  # 台指期貨
+}
+
+# 預先編譯的數字比對樣式
+_NUM_RE = re.compile(r'[-+]?\d[\d,]*')
+# 備用搜尋時判斷為淨部位的最小絕對值
+_POSITION_THRESHOLD = 1000
+# 轉換整數前要移除的千分位逗號與空白
+_DIGIT_TABLE = str.maketrans('', '', ', ')
+# 台指期貨表頭欄位：依收盤價、漲跌、漲跌百分比的優先順序各以前瞻比對整格文字，
+# 比對成功的具名群組 (lastgroup) 即為欄位名稱
+_TX_HEADER_RE = re.compile(
+    r'(?:(?=.*(?:收盤|settlement|close))(?P<close>)'
+    r'|(?=.*(?:漲跌|change))(?P<change>)'
+    r'|(?=.*(?:%|漲跌幅|change rate))(?P<change_percent>))', re.I | re.S)
+# 三大法人期貨表頭的多空淨額欄位 (買賣差額、多空淨額或 net)
+_INSTITUTIONAL_NET_HEADER_RE = re.compile(
+    r'^(?=.*買賣)(?=.*差額)|^(?=.*多空)(?=.*淨額)|net', re.I | re.S)
+# 選擇權表頭的買賣差額口數欄位 (可能有多個差額欄位，需包含「口數」)
+_OPTIONS_NET_HEADER_RE = re.compile(
+    r'^(?=.*(?:買賣差額|買賣淨額|net))(?=.*(?:口數|部位|position))', re.I | re.S)
+# 選擇權表格文字中買權與賣權區段的起點
+_SECTION_RE = re.compile('買權|賣權')
+# 判斷選擇權資料列所屬區段的關鍵字，以單一正則表達式一次比對
+_OPTION_SIDES = {'買權': 'call', 'call': 'call', '賣權': 'put', 'put': 'put'}
+_OPTION_SIDE_RE = re.compile('|'.join(_OPTION_SIDES), re.I)
+# 解析漲跌數值時一次移除的符號、百分比、千分位逗號與空白
+_SIGN_STRIP_TABLE = str.maketrans('', '', '▲▼+-%, ')
+_SIGNED_NUM_RE = re.compile(r'([▲▼+\-]?)\s*([\d,]+(?:\.\d+)?)%?')
+_OUTSIDE_PAREN_RE = re.compile(r'(\d[\d,]*)\s*\(')
+_INSIDE_PAREN_RE = re.compile(r'\((\d[\d,]*)\)')
+_TRADERS_CELL_RE = re.compile(r'(\d[\d,]*)(?:\s*\((\d[\d,]*)\))?')
+
+# 十大交易人報表表頭關鍵字：依序判斷欄位為買方、賣方或淨部位
+_TRADERS_HEADER_SIDES = (
+    (('買方', '多方'), 'buy'),
+    (('賣方', '空方'), 'sell'),
+    (('淨部位', '未沖銷'), 'net'),
+)
+_TOP10_TRADERS_KEYWORDS = ('前十大交易人', '前10大交易人')
+
+# 以 XPath 在 lxml 內一次找出目標表格 (依文件順序取第一個)，英文關鍵字以 translate 忽略大小寫
+_TABLE_F_XPATH = lxml.etree.XPath(
+    "(//table[contains(concat(' ', normalize-space(@class), ' '), ' table_f ')])[1]")
+_FUTURES_TABLE_XPATH = lxml.etree.XPath(
+    "(//table[contains(., '臺股期貨') or contains(., '小型臺指期貨')])[1]")
+_TRADERS_TABLE_XPATH = lxml.etree.XPath(
+    "(//table[(contains(., '前十大交易人') or contains(., '大額交易人'))"
+    " and (contains(., '臺股期貨') or contains(translate(., 'TX', 'tx'), 'tx'))])[1]")
+_OPTIONS_TABLE_XPATH = lxml.etree.XPath(
+    "(//table[(contains(., '臺指選擇權') or contains(., '台指選擇權'))"
+    " and (contains(., '買權') or contains(., '賣權'))])[1]")
+_OPTIONS_LOOSE_TABLE_XPATH = lxml.etree.XPath(
+    "(//table[contains(., '選擇權') and (contains(., '買權') or contains(., '賣權')"
+    " or contains(translate(., 'CALPUT', 'calput'), 'call') or contains(translate(., 'CALPUT', 'calput'), 'put'))])[1]")
+# 十大交易人表格中表頭以外、臺股期貨所有契約 (或全部契約) 的數據行
+_TRADERS_DATA_ROW_XPATH = lxml.etree.XPath(
+    "(.//tr)[position() > 1][(contains(., '臺股期貨') and contains(., '所有契約')) or contains(., '全部契約')][1]")
+# 選擇權表格中表頭以外、淨部位儲存格 (第 $idx 欄) 有內容且屬於外資 (不含外資自營) 的買權/賣權資料列
+_OPTIONS_FOREIGN_ROWS_XPATH = lxml.etree.XPath(
+    "(.//tr)[position() > 1][normalize-space(td[$idx + 1])]"
+    "[contains(., '外資') and not(contains(., '外資自營'))]"
+    "[contains(., '買權') or contains(., '賣權')"
+    " or contains(translate(., 'CALPUT', 'calput'), 'call') or contains(translate(., 'CALPUT', 'calput'), 'put')]")
+
+class _KeepDigitsTable(dict):
+    """str.translate 使用的對照表：保留數字與負號，其餘字元 (首次遇到時記錄) 一律刪除"""
+    
+    def __missing__(self, codepoint):
+        self[codepoint] = None
+        return None
+
+# 選擇權淨部位儲存格只保留數字與負號
+_NET_KEEP_TABLE = _KeepDigitsTable({ord(c): ord(c) for c in '0123456789-'})
+
+# 三大法人期貨報表的契約名稱 (中英文) 對應契約類型，比對時長名稱優先
+_CONTRACT_MAP = {
+    '臺股期貨': '臺股期貨',
+    'TX': '臺股期貨',
+    '小型臺指期貨': '小型臺指期貨',
+    'MTX': '小型臺指期貨',
+    '微型臺指期貨': '微型臺指期貨',
+    'MXF': '微型臺指期貨',
+}
+_CONTRACT_RE = re.compile('|'.join(re.escape(name) for name in sorted(_CONTRACT_MAP, key=len, reverse=True)))
+
+# 三大法人期貨表格中欄數足夠 (含第 $idx 欄) 的契約標題行或外資 (不含外資自營) 資料行，
+# 其餘資料行在 lxml 內直接略過，Python 只需依序處理這些行
+_INSTITUTIONAL_ROWS_XPATH = lxml.etree.XPath(
+    ".//tr[count(td) > $idx]"
+    "[" + " or ".join(f"contains(td[1], '{name}')" for name in _CONTRACT_MAP) +
+    " or ((contains(td[2], '外資') or contains(td[2], 'Foreign')) and not(contains(td[2], '外資自營')))]")
+
+# 各契約類型的外資淨部位要寫入的結果欄位
+_FOREIGN_NET_KEYS = {
+    '臺股期貨': ('foreign_tx',),
+    '小型臺指期貨': ('foreign_mtx', 'mtx_foreign_net'),
+    '微型臺指期貨': ('xmtx_foreign_net',),
+}
+
+
+# 行程內的期貨數據結果快取，僅保留最近幾個日期；報表尚未公布時的結果保留 15 分鐘，避免盤中每次查詢都重新爬取
+_RESULT_CACHE = ResultCache(size=8, pending_ttl=900)
+
+# 抓取與解析期交所報表共用的執行緒池，避免每次呼叫重新建立執行緒；
+# 首次查詢時才建立，只引入 clear_futures_cache 的排程行程不會建立執行緒池
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+def _fast_int(text):
+    """
+    將數字字串 (可含千分位逗號與空白) 直接轉為整數
+    
+    Args:
+        text: 數字字串，通常已由正則表達式取出
+        
+    Returns:
+        int: 整數值，空值或 '-'/'--' 返回 0，無法直接轉換時改用 safe_int
+    """
+    if not text or text in ('-', '--'):
+        return 0
+    try:
+        return int(text.translate(_DIGIT_TABLE))
+    except ValueError:
+        return safe_int(text)
+
+def _pick_position(numbers):
+    """
+    從備用搜尋取得的數字中挑出第一個可能是淨部位的值
+    
+    Args:
+        numbers: 數字字串或正則比對結果 (match 物件) 的序列，可為惰性迭代器
+        
+    Returns:
+        int: 第一個絕對值大於門檻的數字，找不到時返回 0
+    """
+    for n in numbers:
+        pos = _fast_int(n if isinstance(n, str) else n.group())
+        if abs(pos) > _POSITION_THRESHOLD:  # 通常淨部位是較大數字
+            return pos
+    return 0
+
+def _parse_signed(text):
+    """
+    解析帶有漲跌符號的數值，例如 "▲85"、"▼0.37%"、"-12"
+    
+    Args:
+        text: 儲存格文字
+        
+    Returns:
+        float: 帶正負號的數值，無法解析時返回 0.0
+    """
+    # 常見的「符號 + 數字」格式一次移除符號與千分位後直接轉換
+    text = text.strip()
+    sign = -1 if text.startswith(('▼', '-')) else 1
+    try:
+        return sign * float(text.translate(_SIGN_STRIP_TABLE))
+    except ValueError:
+        pass
+    
+    # 夾雜其他文字時改用正則表達式取出數值
+    match = _SIGNED_NUM_RE.search(text)
+    if not match:
+        return 0.0
+    sign = -1 if match.group(1) in ('▼', '-') else 1
+    return sign * safe_float(match.group(2))
+
+def _classify_traders_header(text):
+    """
+    依關鍵字表判斷十大交易人報表的表頭欄位類型
+    
+    Args:
+        text: 小寫的表頭文字
+        
+    Returns:
+        str: 'buy'、'sell' 或 'net'，皆不符合時返回 None
+    """
+    for keywords, side in _TRADERS_HEADER_SIDES:
+        if any(keyword in text for keyword in keywords):
+            return side
+    return None
+
+def _parse_traders_cell(cell_text):
+    """
+    解析「十大交易人 (特定法人)」格式的儲存格
+    
+    Args:
+        cell_text: 儲存格文字，例如 "45,678 (30,123)"
+        
+    Returns:
+        tuple: (十大交易人口數, 特定法人口數)，找不到的數值為 None
+    """
+    # 常見格式一次比對即可同時取得括號外與括號內的數字
+    match = _TRADERS_CELL_RE.search(cell_text)
+    if not match:
+        return None, None
+    
+    traders, specific = match.groups()
+    if specific is None:
+        # 第一個數字後沒有括號，分別尋找括號外與括號內的數字
+        match = _OUTSIDE_PAREN_RE.search(cell_text)
+        if match:
+            traders = match.group(1)
+        match = _INSIDE_PAREN_RE.search(cell_text)
+        if match:
+            specific = match.group(1)
+    
+    return _fast_int(traders), (_fast_int(specific) if specific is not None else None)
+
+def _first_table(xpath, tree):
+    """
+    以預先編譯的 XPath 尋找表格
+    
+    Args:
+        xpath: lxml.etree.XPath 物件
+        tree: lxml 文件樹
+        
+    Returns:
+        第一個符合的表格元素，找不到時返回 None
+    """
+    tables = xpath(tree)
+    return tables[0] if tables else None
+
+def _find_table_f(tree):
+    """返回文件中第一個 class 含 table_f 的表格，找不到時返回 None"""
+    return _first_table(_TABLE_F_XPATH, tree)
+
+def _map_tx_header(header_rows):
+    """
+    從台指期貨報表的表頭行找出收盤價、漲跌與漲跌百分比欄位，三者都找到即停止
+    
+    Args:
+        header_rows: 表頭行元素序列
+        
+    Returns:
+        dict: 欄位名稱對應的欄位索引，找不到的欄位不會出現
+    """
+    header_mapping = {}
+    for header_row in header_rows:
+        for idx, th in enumerate(header_row.xpath('./th|./td')):
+            # 每個儲存格只比對一次，以符合的分支名稱作為欄位名稱
+            match = _TX_HEADER_RE.match(th.text_content())
+            if match:
+                header_mapping[match.lastgroup] = idx
+                if len(header_mapping) == 3:
+                    return header_mapping
+    return header_mapping
+
+def _find_header_column(header_rows, pattern):
+    """
+    依序檢查表頭行的儲存格，返回第一個符合樣式的欄位索引
+    
+    Args:
+        header_rows: 表頭行元素序列
+        pattern: 預先編譯的表頭樣式
+        
+    Returns:
+        int: 欄位索引，找不到時返回 -1
+    """
+    for header_row in header_rows:
+        for idx, th in enumerate(header_row.xpath('./th|./td')):
+            if pattern.search(th.text_content()):
+                return idx
+    return -1
+
+def _pick_column(table, candidates):
+    """
+    從候選欄位索引中選出第一個在表格內存在的欄位
+    
+    Args:
+        table: lxml 表格元素
+        candidates: 候選欄位索引序列
+        
+    Returns:
+        int: 第一個有資料列的儲存格數超過該索引的候選值，皆不存在時返回 -1
+    """
+    for idx in candidates:
+        # 由 XPath 在 lxml 內判斷是否有任一列的儲存格數大於索引，不必逐列計算欄數
+        if table.xpath(f'boolean(.//tr[count(th|td) > {idx}])'):
+            return idx
+    return -1
+
 def get_futures_data():
     """
     獲取期貨相關數據
@@ -18,29 +313,77 @@ def get_futures_data():
     Returns:
         dict: 包含期貨數據的字典
     """
-    try:
-        # 取得日期
-        date = get_tw_stock_date('%Y%m%d')
+    # 查詢日期已略過週末與休市日，一定是有報表的交易日
+    date = get_tw_stock_date('%Y%m%d')
+    
+    # 快取尚未過期時直接返回先前解析的結果
+    cached = _RESULT_CACHE.get(date)
+    if cached is not None:
+        return cached
+    
+    result, complete = _collect_futures_data(date)
+    
+    # 只保留成功取得台指期收盤價的結果；已公布且所有來源皆成功時不會再變動，可一直沿用
+    if result['close'] > 0:
+        _RESULT_CACHE.set(date, result, final=complete and is_report_final(date))
+    
+    return result
+
+def clear_futures_cache():
+    """清除行程內快取的期貨數據 (供排程於收盤後或夜間呼叫)"""
+    _RESULT_CACHE.clear()
+
+def _get_executor():
+    """取得共用的執行緒池 (首次呼叫時建立)"""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=5)
+        return _EXECUTOR
+
+def _collect_futures_data(date):
+    """
+    抓取並合併指定日期的期貨相關數據
+    
+    Args:
+        date: 日期字符串，格式為YYYYMMDD
         
-        # 先獲取大盤加權指數收盤價，用於計算台指期貨偏差值
-        taiex_data = get_taiex_data()
+    Returns:
+        tuple: (包含期貨數據的字典, 是否所有來源皆成功取得數據)
+    """
+    try:
+        # 加權指數與四個期交所報表彼此獨立，同時發出請求以重疊網路等待時間
+        executor = _get_executor()
+        # 大盤加權指數收盤價，用於計算台指期貨偏差值
+        taiex_future = executor.submit(get_taiex_data)
+        # 台指期貨數據
+        tx_future = executor.submit(get_tx_futures_data, date)
+        # 三大法人期貨部位數據 (採用表頭映射方式)
+        institutional_future = executor.submit(get_institutional_futures_data, date)
+        # 十大交易人數據 (採用表頭映射方式)
+        traders_future = executor.submit(get_top_traders_data, date)
+        # 選擇權持倉數據 (採用表頭映射方式)
+        options_future = executor.submit(get_options_positions_data, date)
+        
+        taiex_data = taiex_future.result()
         taiex_close = taiex_data.get('close', 0) if taiex_data else 0
         
-        # 獲取台指期貨數據
-        tx_data = get_tx_futures_data(date, taiex_close)
-        
-        # 獲取三大法人期貨部位數據 (採用表頭映射方式)
-        institutional_futures = get_institutional_futures_data(date)
+        tx_data = tx_future.result()
+        tx_data['taiex_close'] = taiex_close
+        institutional_futures = institutional_future.result()
+        traders_data = traders_future.result()
+        options_data = options_future.result()
         
-        # 獲取十大交易人數據 (採用表頭映射方式)
-        traders_data = get_top_traders_data(date)
+        # 失敗的來源返回 None (選擇權為 None 淨部位) 並改用預設值，此時結果不完整，不可長期沿用
+        complete = (taiex_close > 0 and institutional_futures is not None and traders_data is not None
+                    and options_data['foreign_call_net'] is not None and options_data['foreign_put_net'] is not None)
         
-        # 獲取選擇權持倉數據 (採用表頭映射方式)
-        options_data = get_options_positions_data(date)
-        
-        # 合併數據
-        result = {**tx_data, **institutional_futures, **traders_data, **options_data}
-        result['date'] = date
+        # 合併數據 (以預設範本為底，確保欄位齊全且順序固定)
+        result = default_futures_data(date)
+        result.update(tx_data)
+        result.update(institutional_futures or _INSTITUTIONAL_DEFAULT)
+        result.update(traders_data or _TOP_TRADERS_DEFAULT)
+        result.update(options_data)
         
         # 計算偏差 (僅當兩個數值都正常時才計算)
         if result['close'] > 0 and taiex_close > 0:
@@ -48,15 +391,19 @@ def get_futures_data():
         else:
             result['bias'] = 0.0
         
-        logger.info(f"期貨數據: 收盤={result['close']}, 加權指數={taiex_close}, 偏差={result['bias']}")
-        logger.info(f"期貨籌碼: 外資台指={result['foreign_tx']}, 外資小台={result['foreign_mtx']}, 十大交易人={result['top10_traders_net']}, 十大特定法人={result['top10_specific_net']}")
-        logger.info(f"選擇權籌碼: 外資買權={result['foreign_call_net']}, 外資賣權={result['foreign_put_net']}")
+        # 以延遲格式化的單一日誌輸出摘要，日誌層級高於 INFO 時不會組字串
+        logger.info("期貨數據: 收盤=%s, 加權指數=%s, 偏差=%s; "
+                    "期貨籌碼: 外資台指=%s, 外資小台=%s, 十大交易人=%s, 十大特定法人=%s; "
+                    "選擇權籌碼: 外資買權=%s, 外資賣權=%s",
+                    result['close'], taiex_close, result['bias'],
+                    result['foreign_tx'], result['foreign_mtx'], result['top10_traders_net'], result['top10_specific_net'],
+                    result['foreign_call_net'], result['foreign_put_net'])
         
-        return result
+        return result, complete
     
     except Exception as e:
         logger.error(f"獲取期貨數據時出錯: {str(e)}")
-        return default_futures_data(date)
+        return default_futures_data(date), False
 
 def get_tx_futures_data(date, taiex_close=0):
     """
@@ -73,129 +420,90 @@ def get_tx_futures_data(date, taiex_close=0):
         # 使用URL格式
         url = "https://www.taifex.com.tw/cht/3/futDailyMarketReport"
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9',
-            'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Referer': 'https://www.taifex.com.tw/cht/3/futDailyMarketReport'
-        }
-        
         # 使用POST方法，提供查詢參數
-        data = {
-            'queryType': '2',  # 期貨報價
-            'marketCode': '0',  # 所有市場
-            'dateaddcnt': '',
-            'commodity_id': 'TX',  # 台指期貨
-            'queryDate': date[:4] + '/' + date[4:6] + '/' + date[6:],  # 格式化日期為YYYY/MM/DD
-        }
-        
-        response = requests.post(url, headers=headers, data=data)
-        response.raise_for_status()
-        
-        # 嘗試使用不同的編碼
-        for encoding in ['utf-8', 'big5', 'cp950']:
-            try:
-                response.encoding = encoding
-                soup = BeautifulSoup(response.text, 'lxml')
-                break
-            except:
-                continue
+        data = {**_TX_QUERY, 'queryDate': format_query_date(date)}
         
-        # 解析表格 - 找到可能包含台指期貨資料的表格
-        tables = soup.find_all('table', class_='table_f')
-        if not tables or len(tables) < 1:
-            logger.error("找不到台指期貨表格")
-            return default_tx_data(taiex_close)
-        
-        # 獲取第一個表格，此表格通常包含期貨報價資訊
-        table = tables[0]
-        
-        # 建立表頭映射 - 找出關鍵欄位索引
-        header_mapping = {}
-        header_rows = table.find_all('tr')[:3]  # 通常表頭在前幾行
-        
-        # 遍歷標題行尋找欄位索引
-        for header_row in header_rows:
-            th_elements = header_row.find_all(['th', 'td'])
-            for idx, th in enumerate(th_elements):
-                text = th.text.strip().lower()
-                if '收盤' in text or 'settlement' in text or 'close' in text:
-                    header_mapping['close'] = idx
-                elif '漲跌' in text or 'change' in text:
-                    header_mapping['change'] = idx
-                elif '%' in text or '漲跌幅' in text or 'change rate' in text:
-                    header_mapping['change_percent'] = idx
-        
-        # 查找近月TX合約
-        tx_row = None
-        contract_month = ""
-        
-        # 遍歷資料行，尋找TX合約且不含W的合約(排除週選)
-        for row in table.find_all('tr')[3:]:  # 跳過表頭行
-            cells = row.find_all('td')
-            if len(cells) < max(header_mapping.values()) + 1:
-                continue
-                
-            contract_id = cells[0].text.strip()
-            if len(cells) > 1:
-                month = cells[1].text.strip()
-            else:
-                continue
-                
-            # 判斷是否為台指期近月合約 (TX 且不含 W)
-            if contract_id == 'TX' and 'W' not in month:
-                tx_row = cells
-                contract_month = month
-                break
-        
-        if not tx_row:
-            logger.error("找不到近月台指期貨合約")
-            return default_tx_data(taiex_close)
-        
-        # 使用表頭映射取得收盤價、漲跌和漲跌百分比
-        try:
-            # 收盤價
-            close_idx = header_mapping.get('close', 5)  # 預設索引 5
-            close_price_text = tx_row[close_idx].text.strip().replace(',', '')
-            close_price = safe_float(close_price_text)
-            
-            # 漲跌
-            change_idx = header_mapping.get('change', 6)  # 預設索引 6
-            change_text = tx_row[change_idx].text.strip().replace(',', '')
-            change_value = 0.0
-            if change_text and change_text != '--':
-                if '▲' in change_text or '+' in change_text:
-                    change_value = safe_float(change_text.replace('▲', '').replace('+', ''))
-                elif '▼' in change_text or '-' in change_text:
-                    change_value = -safe_float(change_text.replace('▼', '').replace('-', ''))
-            
-            # 漲跌百分比
-            change_percent_idx = header_mapping.get('change_percent', 7)  # 預設索引 7
-            change_percent_text = tx_row[change_percent_idx].text.strip().replace(',', '')
-            change_percent = 0.0
-            if change_percent_text and change_percent_text != '--':
-                if '▲' in change_percent_text or '+' in change_percent_text:
-                    change_percent = safe_float(change_percent_text.replace('▲', '').replace('+', '').replace('%', ''))
-                elif '▼' in change_percent_text or '-' in change_percent_text:
-                    change_percent = -safe_float(change_percent_text.replace('▼', '').replace('-', '').replace('%', ''))
-            
-            logger.info(f"台指期貨: 收盤價={close_price}, 漲跌={change_value}, 漲跌%={change_percent}")
-            
-            return {
-                'close': close_price,
-                'change': change_value,
-                'change_percent': change_percent,
-                'taiex_close': taiex_close,
-                'contract_month': contract_month
-            }
-        except Exception as e:
-            logger.error(f"解析台指期貨數據時出錯: {str(e)}")
-            return default_tx_data(taiex_close)
+        tree = fetch_taifex_tree(url, _TX_HEADERS, data, _TABLE_F_XPATH)
+        return _parse_tx_futures(tree, taiex_close)
     
     except Exception as e:
         logger.error(f"獲取台指期貨數據時出錯: {str(e)}")
         return default_tx_data(taiex_close)
 
+def _parse_tx_futures(tree, taiex_close):
+    """
+    解析台指期貨報表，取得近月合約的收盤價與漲跌
+    
+    Args:
+        tree: 期貨每日交易行情的 lxml 文件樹
+        taiex_close: 加權指數收盤價
+        
+    Returns:
+        dict: 台指期貨數據
+    """
+    # 解析表格 - 第一個 table_f 表格通常包含期貨報價資訊
+    table = _find_table_f(tree)
+    if table is None:
+        logger.error("找不到台指期貨表格")
+        return default_tx_data(taiex_close)
+    
+    # 建立表頭映射 - 找出關鍵欄位索引 (通常表頭在前幾行)
+    # 以惰性迭代器逐行讀取，找到近月合約後即停止，不必先建立整個表格的行列表
+    rows = table.iter('tr')
+    header_mapping = _map_tx_header(list(islice(rows, 3)))
+    
+    # 查找近月TX合約
+    tx_row = None
+    contract_month = ""
+    
+    # 表頭映射在資料行迴圈中不變，先解析為區域變數 (找不到時使用預設索引)
+    close_idx = header_mapping.get('close', 5)  # 預設索引 5
+    change_idx = header_mapping.get('change', 6)  # 預設索引 6
+    change_percent_idx = header_mapping.get('change_percent', 7)  # 預設索引 7
+    min_cells = max(close_idx, change_idx, change_percent_idx) + 1
+    
+    # 遍歷資料行，尋找TX合約且不含W的合約(排除週選)
+    for row in rows:  # 表頭行已由迭代器取出
+        cells = row.findall('td')
+        if len(cells) < min_cells or len(cells) < 2:
+            continue
+    
+        # 非 TX 的資料行 (絕大多數) 只讀取第一欄文字即略過
+        if cells[0].text_content().strip() != 'TX':
+            continue
+        month = cells[1].text_content().strip()
+    
+        # 判斷是否為台指期近月合約 (TX 且不含 W)，只保留儲存格，稍後僅讀取需要的三個欄位
+        if 'W' not in month:
+            tx_row = cells
+            contract_month = month
+            break
+    
+    if not tx_row:
+        logger.error("找不到近月台指期貨合約")
+        return default_tx_data(taiex_close)
+    
+    # 使用表頭映射取得收盤價、漲跌和漲跌百分比 (千分位逗號與空白由各轉換函式一次略過，不另建中間字串)
+    # 資料行已確認含有所需欄位，且各轉換函式遇到空值或 '--' 時返回 0，不需以例外處理
+    # 收盤價
+    close_price = safe_float(tx_row[close_idx].text_content())
+    
+    # 漲跌
+    change_value = _parse_signed(tx_row[change_idx].text_content())
+    
+    # 漲跌百分比
+    change_percent = _parse_signed(tx_row[change_percent_idx].text_content())
+    
+    logger.info("台指期貨: 收盤價=%s, 漲跌=%s, 漲跌%%=%s", close_price, change_value, change_percent)
+    
+    return {
+        'close': close_price,
+        'change': change_value,
+        'change_percent': change_percent,
+        'taiex_close': taiex_close,
+        'contract_month': contract_month
+    }
+
 def get_institutional_futures_data(date):
     """
     獲取三大法人期貨持倉資料 - 使用表頭映射方法
@@ -204,192 +512,105 @@ def get_institutional_futures_data(date):
         date: 日期字符串，格式為YYYYMMDD
         
     Returns:
-        dict: 三大法人期貨持倉資料
+        dict: 三大法人期貨持倉資料，抓取或解析失敗時返回 None
     """
     try:
         # 使用Excel格式URL以獲取更穩定的資料 (根據您的建議)
         url = f"https://www.taifex.com.tw/cht/3/futContractsDateExcel"
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9',
-            'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Referer': 'https://www.taifex.com.tw/cht/3/futContractsDate'
-        }
-        
         # 使用POST方法，提供查詢參數
-        data = {
-            'queryType': '1',
-            'goDay': '',
-            'doQuery': '1',
-            'dateaddcnt': '',
-            'queryDate': date[:4] + '/' + date[4:6] + '/' + date[6:],  # 格式化日期為YYYY/MM/DD
-        }
-        
-        # 初始化結果
-        result = default_institutional_data()
-        
-        response = requests.post(url, headers=headers, data=data)
-        response.raise_for_status()
-        
-        # 嘗試使用不同的編碼
-        for encoding in ['utf-8', 'big5', 'cp950']:
-            try:
-                response.encoding = encoding
-                soup = BeautifulSoup(response.text, 'lxml')
-                break
-            except:
-                continue
-        
-        # 查找包含期貨部位資訊的表格 (Excel格式頁面可能沒有class='table_f')
-        tables = soup.find_all('table')
-        if not tables:
-            logger.error("找不到三大法人期貨部位表格")
-            return result
-        
-        # 尋找包含「臺股期貨」和「小型臺指期貨」的表格
-        target_table = None
-        for table in tables:
-            if '臺股期貨' in table.text or '小型臺指期貨' in table.text:
-                target_table = table
-                break
+        data = {**TAIFEX_BASE_QUERY, 'queryDate': format_query_date(date)}
         
-        if not target_table:
-            logger.error("找不到包含臺股期貨或小型臺指期貨的表格")
-            return result
-        
-        # 建立表頭映射
-        net_position_idx = -1
-        header_rows = target_table.find_all('tr')[:2]  # 通常表頭在前幾行
+        tree = fetch_taifex_tree(url, _INSTITUTIONAL_HEADERS, data, _FUTURES_TABLE_XPATH)
+        return _parse_institutional_futures(tree)
+    
+    except Exception as e:
+        logger.error(f"獲取三大法人期貨持倉數據時出錯: {str(e)}")
+        return None
+
+def _parse_institutional_futures(tree):
+    """
+    解析三大法人期貨報表，取得外資各契約淨部位
+    
+    Args:
+        tree: 三大法人期貨報表的 lxml 文件樹
         
-        for header_row in header_rows:
-            th_elements = header_row.find_all(['th', 'td'])
-            for idx, th in enumerate(th_elements):
-                text = th.text.strip().lower()
-                if ('買賣' in text and '差額' in text) or ('多空' in text and '淨額' in text) or ('net' in text):
-                    net_position_idx = idx
-                    break
+    Returns:
+        dict: 三大法人期貨持倉資料，找不到表格或淨部位欄位時返回 None
+    """
+    # 初始化結果
+    result = default_institutional_data()
+    
+    # 尋找包含「臺股期貨」或「小型臺指期貨」的表格 (Excel格式頁面可能沒有class='table_f')
+    target_table = _first_table(_FUTURES_TABLE_XPATH, tree)
+    
+    if target_table is None:
+        logger.error("找不到包含臺股期貨或小型臺指期貨的表格")
+        return None
+    
+    # 建立表頭映射 (通常表頭在前幾行)，找到淨額欄位即停止
+    net_position_idx = _find_header_column(target_table.xpath('(.//tr)[position() <= 2]'),
+                                           _INSTITUTIONAL_NET_HEADER_RE)
+    
+    # 如果找不到明確的淨部位欄位，嘗試常見的索引位置
+    if net_position_idx == -1:
+        logger.warning("找不到淨部位欄位，嘗試使用預設索引")
+        # 通常是第8欄，但有時是第9欄或第10欄，取決於表格結構
+        net_position_idx = _pick_column(target_table, (8, 9, 10))
         
-        # 如果找不到明確的淨部位欄位，嘗試常見的索引位置
         if net_position_idx == -1:
-            logger.warning("找不到淨部位欄位，嘗試使用預設索引")
-            # 通常是第8欄，但有時是第9欄或第10欄，取決於表格結構
-            net_position_candidates = [8, 9, 10]
-            max_cols = 0
-            
-            # 檢查表格有多少列
-            for row in target_table.find_all('tr'):
-                max_cols = max(max_cols, len(row.find_all(['td', 'th'])))
-            
-            # 選擇一個有效的索引位置
-            for idx in net_position_candidates:
-                if idx < max_cols:
-                    net_position_idx = idx
-                    break
-            
-            if net_position_idx == -1:
-                logger.error("無法確定淨部位欄位位置")
-                return result
-        
-        # 遍歷表格尋找臺股期貨和小型臺指期貨的外資部位
-        contract_type = None
-        for row in target_table.find_all('tr'):
-            cells = row.find_all('td')
-            if len(cells) < net_position_idx + 1:
-                continue
-            
-            # 檢查是否為契約標題行
-            first_cell_text = cells[0].text.strip() if cells else ""
-            if '臺股期貨' in first_cell_text or 'TX' in first_cell_text:
-                contract_type = '臺股期貨'
-                continue
-            elif '小型臺指期貨' in first_cell_text or 'MTX' in first_cell_text:
-                contract_type = '小型臺指期貨'
-                continue
-            elif '微型臺指期貨' in first_cell_text or 'MXF' in first_cell_text:
-                contract_type = '微型臺指期貨'
-                continue
-            
-            # 檢查是否為外資的資料行
-            if len(cells) > 1 and contract_type:
-                identity_cell = cells[1].text.strip() if len(cells) > 1 else ""
-                # 擴大匹配條件，包括可能的不同表示方式
-                if ('外資' in identity_cell or 'Foreign' in identity_cell) and '外資自營' not in identity_cell:
-                    # 取得淨部位數值
-                    if net_position_idx < len(cells):
-                        # 嘗試從淨部位欄位取得數值
-                        net_cell = cells[net_position_idx]
-                        
-                        # 檢查是否有font標籤
-                        font_tag = net_cell.find('font')
-                        if font_tag:
-                            net_text = font_tag.text.strip()
-                        else:
-                            net_text = net_cell.text.strip()
-                        
-                        # 移除千分位逗號並處理可能的空值
-                        net_text = net_text.replace(',', '')
-                        if net_text and net_text != '-' and net_text != '--':
-                            net_position = safe_int(net_text)
-                            
-                            # 根據契約類型存入結果
-                            if contract_type == '臺股期貨' and net_position != 0:
-                                result['foreign_tx'] = net_position
-                                logger.info(f"找到外資臺股期貨淨部位: {net_position}")
-                            elif contract_type == '小型臺指期貨' and net_position != 0:
-                                result['foreign_mtx'] = net_position
-                                result['mtx_foreign_net'] = net_position
-                                logger.info(f"找到外資小型臺指期貨淨部位: {net_position}")
-                            elif contract_type == '微型臺指期貨' and net_position != 0:
-                                result['xmtx_foreign_net'] = net_position
-                                logger.info(f"找到外資微型臺指期貨淨部位: {net_position}")
-        
-        # 檢查是否成功獲取數據
-        if result['foreign_tx'] == 0 and result['foreign_mtx'] == 0:
-            logger.warning("Excel格式未找到外資期貨淨部位，嘗試備用搜尋方法")
-            
-            # 嘗試另一種分析方法 - 搜索整個表格文本
-            for row in target_table.find_all('tr'):
-                cells = row.find_all('td')
-                row_text = ' '.join([cell.text for cell in cells])
-                
-                # 搜索可能包含外資臺股期貨淨部位的文本
-                if ('臺股期貨' in row_text or 'TX' in row_text) and '外資' in row_text:
-                    # 尋找數字
-                    numbers = re.findall(r'[-+]?[\d,]+', row_text)
-                    numbers = [int(n.replace(',', '')) for n in numbers if n.replace(',', '').replace('+', '').replace('-', '').isdigit()]
-                    
-                    if numbers:
-                        # 假設最後一個或倒數第二個數字是淨部位
-                        potential_positions = numbers[-2:]
-                        for pos in potential_positions:
-                            if abs(pos) > 1000:  # 通常淨部位是較大數字
-                                result['foreign_tx'] = pos
-                                logger.info(f"使用備用方法找到外資臺股期貨淨部位: {pos}")
-                                break
-                
-                # 搜索可能包含外資小型臺指淨部位的文本
-                if ('小型臺指' in row_text or 'MTX' in row_text) and '外資' in row_text:
-                    # 尋找數字
-                    numbers = re.findall(r'[-+]?[\d,]+', row_text)
-                    numbers = [int(n.replace(',', '')) for n in numbers if n.replace(',', '').replace('+', '').replace('-', '').isdigit()]
-                    
-                    if numbers:
-                        # 假設最後一個或倒數第二個數字是淨部位
-                        potential_positions = numbers[-2:]
-                        for pos in potential_positions:
-                            if abs(pos) > 1000:  # 通常淨部位是較大數字
-                                result['foreign_mtx'] = pos
-                                result['mtx_foreign_net'] = pos
-                                logger.info(f"使用備用方法找到外資小型臺指淨部位: {pos}")
-                                break
-        
-        logger.info(f"三大法人期貨數據: 外資台指={result['foreign_tx']}, 外資小台={result['foreign_mtx']}")
-        return result
+            logger.error("無法確定淨部位欄位位置")
+            return None
     
-    except Exception as e:
-        logger.error(f"獲取三大法人期貨持倉數據時出錯: {str(e)}")
-        return default_institutional_data()
+    # 依序處理契約標題行與外資資料行，尋找臺股期貨和小型臺指期貨的外資部位
+    contract_type = None
+    for row in _INSTITUTIONAL_ROWS_XPATH(target_table, idx=net_position_idx):
+        cells = row.findall('td')
+        
+        # 檢查是否為契約標題行 (一次比對所有契約名稱)
+        match = _CONTRACT_RE.search(cells[0].text_content())
+        if match:
+            contract_type = _CONTRACT_MAP[match.group(0)]
+            continue
+        
+        # 其餘皆為外資的資料行 (XPath 已排除外資自營商)，須在契約標題行之後
+        if contract_type:
+            # 取得淨部位數值 (儲存格文字已包含 font 標籤內的數字)，空值或 '-' 視為 0
+            net_position = _fast_int(cells[net_position_idx].text_content().strip())
+            
+            # 根據契約類型存入結果
+            if net_position != 0:
+                for key in _FOREIGN_NET_KEYS[contract_type]:
+                    result[key] = net_position
+                logger.debug("找到外資%s淨部位: %s", contract_type, net_position)
+    
+    # 檢查是否成功獲取數據
+    if not result['foreign_tx'] and not result['foreign_mtx']:
+        logger.warning("Excel格式未找到外資期貨淨部位，嘗試備用搜尋方法")
+        
+        # 嘗試另一種分析方法 - 搜索整個表格文本
+        for row in target_table.iter('tr'):
+            row_text = ' '.join(cell.text_content().strip() for cell in row.findall('td'))
+            
+            # 搜索可能包含外資臺股期貨淨部位的文本
+            if ('臺股期貨' in row_text or 'TX' in row_text) and '外資' in row_text:
+                # 假設最後一個或倒數第二個數字是淨部位
+                pos = _pick_position(_NUM_RE.findall(row_text)[-2:])
+                if pos:
+                    result['foreign_tx'] = pos
+                    logger.info("使用備用方法找到外資臺股期貨淨部位: %s", pos)
+            
+            # 搜索可能包含外資小型臺指淨部位的文本
+            if ('小型臺指' in row_text or 'MTX' in row_text) and '外資' in row_text:
+                # 假設最後一個或倒數第二個數字是淨部位
+                pos = _pick_position(_NUM_RE.findall(row_text)[-2:])
+                if pos:
+                    result['foreign_mtx'] = pos
+                    result['mtx_foreign_net'] = pos
+                    logger.info("使用備用方法找到外資小型臺指淨部位: %s", pos)
+    
+    logger.info("三大法人期貨數據: 外資台指=%s, 外資小台=%s", result['foreign_tx'], result['foreign_mtx'])
+    return result
 
 def get_top_traders_data(date):
     """
@@ -399,246 +620,138 @@ def get_top_traders_data(date):
         date: 日期字符串，格式為YYYYMMDD
         
     Returns:
-        dict: 十大交易人和特定法人持倉資料
+        dict: 十大交易人和特定法人持倉資料，抓取或解析失敗時返回 None
     """
     try:
         # 使用新版表格URL
         url = "https://www.taifex.com.tw/cht/3/largeTraderFutQryTbl"
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9',
-            'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Referer': 'https://www.taifex.com.tw/cht/3/largeTraderFutQryTbl'
-        }
-        
         # 使用POST方法，提供查詢參數
-        data = {
-            'queryType': '1',
-            'goDay': '',
-            'doQuery': '1',
-            'dateaddcnt': '',
-            'queryDate': date[:4] + '/' + date[4:6] + '/' + date[6:],  # 格式化日期為YYYY/MM/DD
-            'commodityId': 'TXF'  # 台指期貨
-        }
-        
-        # 初始化結果
-        result = {
-            'top10_traders_buy': 0,
-            'top10_traders_sell': 0,
-            'top10_traders_net': 0,
-            'top10_specific_buy': 0,
-            'top10_specific_sell': 0,
-            'top10_specific_net': 0,
-            'top10_traders_net_change': 0,
-            'top10_specific_net_change': 0
-        }
-        
-        response = requests.post(url, headers=headers, data=data)
-        response.raise_for_status()
-        
-        # 嘗試使用不同的編碼
-        for encoding in ['utf-8', 'big5', 'cp950']:
-            try:
-                response.encoding = encoding
-                soup = BeautifulSoup(response.text, 'lxml')
-                break
-            except:
-                continue
+        data = {**TAIFEX_BASE_QUERY, 'queryDate': format_query_date(date), 'commodityId': 'TXF'}  # 台指期貨
         
-        # 查找所有表格
-        tables = soup.find_all('table')
-        if not tables:
-            logger.error("找不到任何表格")
-            return result
-        
-        # 先嘗試找到具有特定class的表格
-        target_table = soup.find('table', class_='table_f')
-        
-        # 如果沒有找到，嘗試在所有表格中尋找包含關鍵字的表格
-        if not target_table:
-            for table in tables:
-                table_text = table.text.lower()
-                if ('前十大交易人' in table_text or '大額交易人' in table_text) and ('臺股期貨' in table_text or 'tx' in table_text.lower()):
-                    target_table = table
-                    break
-        
-        if not target_table:
-            logger.error("找不到包含十大交易人資料的表格")
-            return result
-        
-        # 處理表格資料
-        rows = target_table.find_all('tr')
-        if len(rows) < 2:
-            logger.error("表格資料不完整")
-            return result
-        
-        # 分析表頭建立欄位映射
-        header_row = rows[0]
-        headers = header_row.find_all(['th', 'td'])
-        
-        # 建立表頭映射
-        mapping = {}
-        for idx, cell in enumerate(headers):
-            text = cell.text.strip().lower()
-            
-            # 尋找買方部位欄位
-            if '買方' in text or '多方' in text:
-                # 更具體地找出前十大交易人的欄位
-                if '前十大交易人' in text or '前10大交易人' in text:
-                    mapping['top10_traders_buy'] = idx
-                    
-                    # 檢查是否同時包含特定法人資訊(通常在括號內)
-                    if '特定法人' in text:
-                        mapping['specific_buy'] = idx  # 使用同一個索引，但解析時會尋找括號內的數值
-            
-            # 尋找賣方部位欄位
-            elif '賣方' in text or '空方' in text:
-                # 更具體地找出前十大交易人的欄位
-                if '前十大交易人' in text or '前10大交易人' in text:
-                    mapping['top10_traders_sell'] = idx
-                    
-                    # 檢查是否同時包含特定法人資訊
-                    if '特定法人' in text:
-                        mapping['specific_sell'] = idx  # 同上
-            
-            # 尋找淨部位欄位 (如果有的話)
-            elif '淨部位' in text or '未沖銷' in text:
-                if '前十大交易人' in text or '前10大交易人' in text:
-                    mapping['top10_traders_net'] = idx
-                
-                if '特定法人' in text:
-                    mapping['specific_net'] = idx
-        
-        # 如果映射不完整，嘗試更鬆散的匹配
-        if 'top10_traders_buy' not in mapping or 'top10_traders_sell' not in mapping:
-            logger.warning("表頭匹配不完整，嘗試更鬆散匹配")
-            
-            # 先分析表格結構
-            max_rows = len(rows)
-            max_cols = 0
-            for row in rows:
-                cells = row.find_all(['td', 'th'])
-                max_cols = max(max_cols, len(cells))
-            
-            # 如果有足夠的列，通常買方在前半部分，賣方在後半部分
-            if max_cols >= 6:
-                if 'top10_traders_buy' not in mapping:
-                    # 買方通常在前半部分
-                    mapping['top10_traders_buy'] = min(2, max_cols // 4)
-                
-                if 'top10_traders_sell' not in mapping:
-                    # 賣方通常在後半部分
-                    mapping['top10_traders_sell'] = min(max_cols // 2 + 2, max_cols - 2)
-        
-        # 嘗試找出數據行
-        data_row = None
-        for row in rows[1:]:  # 跳過表頭
-            cells = row.find_all('td')
-            row_text = ' '.join([cell.text.strip() for cell in cells])
-            
-            # 尋找包含關鍵詞的行
-            if ('臺股期貨' in row_text and '所有契約' in row_text) or '全部契約' in row_text:
-                data_row = cells
-                break
-        
-        # 如果沒有找到明確的數據行，使用第二行(通常是數據行)
-        if not data_row and len(rows) >= 2:
-            data_row = rows[1].find_all('td')
-        
-        if not data_row:
-            logger.error("無法確定數據行")
-            return result
-        
-        # 從數據行提取資訊
-        try:
-            # 買方部位數據
-            if 'top10_traders_buy' in mapping and mapping['top10_traders_buy'] < len(data_row):
-                cell = data_row[mapping['top10_traders_buy']]
-                cell_text = cell.text.strip()
-                
-                # 先嘗試使用正則表達式尋找括號外的數字(十大交易人)
-                match = re.search(r'(\d+[\d,]*)\s*\(', cell_text)
-                if match:
-                    result['top10_traders_buy'] = safe_int(match.group(1).replace(',', ''))
-                else:
-                    # 直接取整個數字
-                    numbers = re.findall(r'\d+[\d,]*', cell_text)
-                    if numbers:
-                        result['top10_traders_buy'] = safe_int(numbers[0].replace(',', ''))
-                
-                # 尋找括號內的數字(特定法人)
-                match = re.search(r'\((\d+[\d,]*)\)', cell_text)
-                if match:
-                    result['top10_specific_buy'] = safe_int(match.group(1).replace(',', ''))
-            
-            # 賣方部位數據
-            if 'top10_traders_sell' in mapping and mapping['top10_traders_sell'] < len(data_row):
-                cell = data_row[mapping['top10_traders_sell']]
-                cell_text = cell.text.strip()
-                
-                # 先嘗試使用正則表達式尋找括號外的數字(十大交易人)
-                match = re.search(r'(\d+[\d,]*)\s*\(', cell_text)
-                if match:
-                    result['top10_traders_sell'] = safe_int(match.group(1).replace(',', ''))
-                else:
-                    # 直接取整個數字
-                    numbers = re.findall(r'\d+[\d,]*', cell_text)
-                    if numbers:
-                        result['top10_traders_sell'] = safe_int(numbers[0].replace(',', ''))
-                
-                # 尋找括號內的數字(特定法人)
-                match = re.search(r'\((\d+[\d,]*)\)', cell_text)
-                if match:
-                    result['top10_specific_sell'] = safe_int(match.group(1).replace(',', ''))
-            
-            # 如果有淨部位欄位
-            if 'top10_traders_net' in mapping and mapping['top10_traders_net'] < len(data_row):
-                cell = data_row[mapping['top10_traders_net']]
-                cell_text = cell.text.strip()
-                
-                # 先嘗試使用正則表達式尋找括號外的數字(十大交易人)
-                match = re.search(r'(\d+[\d,]*)\s*\(', cell_text)
-                if match:
-                    result['top10_traders_net'] = safe_int(match.group(1).replace(',', ''))
-                else:
-                    # 直接取整個數字
-                    numbers = re.findall(r'\d+[\d,]*', cell_text)
-                    if numbers:
-                        result['top10_traders_net'] = safe_int(numbers[0].replace(',', ''))
-                
-                # 尋找括號內的數字(特定法人)
-                match = re.search(r'\((\d+[\d,]*)\)', cell_text)
-                if match:
-                    result['top10_specific_net'] = safe_int(match.group(1).replace(',', ''))
-            
-        except Exception as e:
-            logger.error(f"解析數據行時出錯: {str(e)}")
-        
-        # 如果沒有直接取得淨部位，計算淨部位
-        if result['top10_traders_net'] == 0 and (result['top10_traders_buy'] > 0 or result['top10_traders_sell'] > 0):
-            result['top10_traders_net'] = result['top10_traders_buy'] - result['top10_traders_sell']
-        
-        if result['top10_specific_net'] == 0 and (result['top10_specific_buy'] > 0 or result['top10_specific_sell'] > 0):
-            result['top10_specific_net'] = result['top10_specific_buy'] - result['top10_specific_sell']
-        
-        logger.info(f"十大交易人資料: 買方={result['top10_traders_buy']}, 賣方={result['top10_traders_sell']}, 淨部位={result['top10_traders_net']}")
-        logger.info(f"十大特定法人資料: 買方={result['top10_specific_buy']}, 賣方={result['top10_specific_sell']}, 淨部位={result['top10_specific_net']}")
-        
-        return result
+        tree = fetch_taifex_tree(url, _TOP_TRADERS_HEADERS, data, _TRADERS_TABLE_XPATH)
+        return _parse_top_traders(tree)
     
     except Exception as e:
         logger.error(f"獲取十大交易人資料時出錯: {str(e)}")
-        return {
-            'top10_traders_buy': 0,
-            'top10_traders_sell': 0,
-            'top10_traders_net': 0,
-            'top10_specific_buy': 0,
-            'top10_specific_sell': 0,
-            'top10_specific_net': 0,
-            'top10_traders_net_change': 0,
-            'top10_specific_net_change': 0
-        }
+        return None
+
+def _parse_top_traders(tree):
+    """
+    解析十大交易人報表，取得十大交易人與特定法人部位
+    
+    Args:
+        tree: 大額交易人報表的 lxml 文件樹
+        
+    Returns:
+        dict: 十大交易人和特定法人持倉資料，找不到表格或表格不完整時返回 None
+    """
+    # 初始化結果
+    result = default_top_traders_data()
+    
+    # 查找所有表格
+    if tree.find('.//table') is None:
+        logger.error("找不到任何表格")
+        return None
+    
+    # 先嘗試找到具有特定class的表格
+    target_table = _find_table_f(tree)
+    
+    # 如果沒有找到，嘗試在所有表格中尋找包含關鍵字的表格
+    if target_table is None:
+        target_table = _first_table(_TRADERS_TABLE_XPATH, tree)
+    
+    if target_table is None:
+        logger.error("找不到包含十大交易人資料的表格")
+        return None
+    
+    # 處理表格資料
+    rows = target_table.xpath('.//tr')
+    if len(rows) < 2:
+        logger.error("表格資料不完整")
+        return None
+    
+    # 分析表頭建立欄位映射
+    header_row = rows[0]
+    headers = header_row.xpath('./th|./td')
+    
+    # 建立表頭映射
+    mapping = {}
+    for idx, cell in enumerate(headers):
+        text = cell.text_content().strip().lower()
+    
+        # 依關鍵字表判斷買方、賣方或淨部位欄位
+        side = _classify_traders_header(text)
+        if side is None:
+            continue
+    
+        # 更具體地找出前十大交易人的欄位
+        is_traders = any(keyword in text for keyword in _TOP10_TRADERS_KEYWORDS)
+        if is_traders:
+            mapping[f'top10_traders_{side}'] = idx
+    
+        # 檢查是否同時包含特定法人資訊(通常在括號內，使用同一個索引，解析時會尋找括號內的數值)
+        if '特定法人' in text and (is_traders or side == 'net'):
+            mapping[f'specific_{side}'] = idx
+    
+    # 如果映射不完整，嘗試更鬆散的匹配
+    if 'top10_traders_buy' not in mapping or 'top10_traders_sell' not in mapping:
+        logger.warning("表頭匹配不完整，嘗試更鬆散匹配")
+    
+        # 先分析表格結構
+        max_cols = max((len(row.xpath('./th|./td')) for row in rows), default=0)
+    
+        # 如果有足夠的列，通常買方在前半部分，賣方在後半部分
+        if max_cols >= 6:
+            if 'top10_traders_buy' not in mapping:
+                # 買方通常在前半部分
+                mapping['top10_traders_buy'] = min(2, max_cols // 4)
+    
+            if 'top10_traders_sell' not in mapping:
+                # 賣方通常在後半部分
+                mapping['top10_traders_sell'] = min(max_cols // 2 + 2, max_cols - 2)
+    
+    # 嘗試找出數據行
+    data_row = None
+    matched_rows = _TRADERS_DATA_ROW_XPATH(target_table)
+    if matched_rows:
+        data_row = matched_rows[0].findall('td')
+    
+    # 如果沒有找到明確的數據行，使用第二行(通常是數據行)
+    if not data_row and len(rows) >= 2:
+        data_row = rows[1].findall('td')
+    
+    if not data_row:
+        logger.error("無法確定數據行")
+        return result
+    
+    # 從數據行提取資訊 (欄位索引已檢查範圍，缺少的數值為 None，不需以例外處理)
+    # 買方、賣方及淨部位欄位皆為「十大交易人 (特定法人)」格式
+    for traders_key, specific_key in (('top10_traders_buy', 'top10_specific_buy'),
+                                      ('top10_traders_sell', 'top10_specific_sell'),
+                                      ('top10_traders_net', 'top10_specific_net')):
+        idx = mapping.get(traders_key, -1)
+        if idx < 0 or idx >= len(data_row):
+            continue
+        
+        traders, specific = _parse_traders_cell(data_row[idx].text_content().strip())
+        if traders is not None:
+            result[traders_key] = traders
+        if specific is not None:
+            result[specific_key] = specific
+    
+    # 如果沒有直接取得淨部位，計算淨部位
+    if result['top10_traders_net'] == 0 and (result['top10_traders_buy'] > 0 or result['top10_traders_sell'] > 0):
+        result['top10_traders_net'] = result['top10_traders_buy'] - result['top10_traders_sell']
+    
+    if result['top10_specific_net'] == 0 and (result['top10_specific_buy'] > 0 or result['top10_specific_sell'] > 0):
+        result['top10_specific_net'] = result['top10_specific_buy'] - result['top10_specific_sell']
+    
+    logger.info("十大交易人資料: 買方=%s, 賣方=%s, 淨部位=%s; 十大特定法人資料: 買方=%s, 賣方=%s, 淨部位=%s",
+                result['top10_traders_buy'], result['top10_traders_sell'], result['top10_traders_net'],
+                result['top10_specific_buy'], result['top10_specific_sell'], result['top10_specific_net'])
+    
+    return result
 
 def get_options_positions_data(date):
     """
@@ -654,256 +767,252 @@ def get_options_positions_data(date):
         # 使用您提供的更穩定的Excel格式URL
         url = "https://www.taifex.com.tw/cht/3/callsAndPutsDateExcel"
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9',
-            'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Referer': 'https://www.taifex.com.tw/cht/3/callsAndPutsDate'
-        }
-        
         # 使用POST方法，提供查詢參數
-        data = {
-            'queryType': '1',
-            'goDay': '',
-            'doQuery': '1',
-            'dateaddcnt': '',
-            'queryDate': date[:4] + '/' + date[4:6] + '/' + date[6:],  # 格式化日期為YYYY/MM/DD
-        }
-        
-        # 初始化結果
-        result = {
-            'foreign_call_buy': 0,
-            'foreign_call_sell': 0,
-            'foreign_call_net': 0,
-            'foreign_put_buy': 0,
-            'foreign_put_sell': 0,
-            'foreign_put_net': 0,
-            'foreign_call_net_change': 0,
-            'foreign_put_net_change': 0
-        }
-        
-        response = requests.post(url, headers=headers, data=data)
-        response.raise_for_status()
-        
-        # 嘗試使用不同的編碼
-        for encoding in ['utf-8', 'big5', 'cp950']:
-            try:
-                response.encoding = encoding
-                soup = BeautifulSoup(response.text, 'lxml')
-                break
-            except:
-                continue
+        data = {**TAIFEX_BASE_QUERY, 'queryDate': format_query_date(date)}
         
-        # 查找所有表格 (Excel格式頁面可能沒有class='table_f')
-        tables = soup.find_all('table')
-        if not tables:
-            logger.error("找不到任何表格")
-            return result
-        
-        # 尋找包含選擇權持倉資訊的表格
-        target_table = None
+        tree = fetch_taifex_tree(url, _OPTIONS_HEADERS, data, _OPTIONS_LOOSE_TABLE_XPATH)
+        return _parse_options_positions(tree)
+    
+    except Exception as e:
+        logger.error(f"獲取選擇權持倉數據時出錯: {str(e)}")
+        return missing_options_data()
+
+def _parse_options_positions(tree):
+    """
+    解析選擇權三大法人報表，取得外資買權與賣權淨部位
+    
+    Args:
+        tree: 選擇權三大法人報表的 lxml 文件樹
         
-        for table in tables:
-            table_text = table.text.lower()
-            if ('臺指選擇權' in table_text or '台指選擇權' in table_text) and ('買權' in table_text or '賣權' in table_text):
-                target_table = table
+    Returns:
+        dict: 選擇權持倉資料，無法取得的外資淨部位為 None
+    """
+    # 初始化結果
+    result = default_options_data()
+    
+    # 查找所有表格 (Excel格式頁面可能沒有class='table_f')
+    if tree.find('.//table') is None:
+        logger.error("找不到任何表格")
+        return result
+    
+    # 尋找包含選擇權持倉資訊的表格
+    target_table = _first_table(_OPTIONS_TABLE_XPATH, tree)
+    
+    if target_table is None:
+        logger.error("找不到包含選擇權持倉資訊的表格")
+    
+        # 嘗試更寬鬆的匹配
+        target_table = _first_table(_OPTIONS_LOOSE_TABLE_XPATH, tree)
+        if target_table is not None:
+            logger.info("找到可能包含選擇權資料的表格")
+    
+        if target_table is None:
+            logger.warning("無法找到選擇權表格，外資買權與賣權淨部位暫無數據")
+            return missing_options_data()
+    
+    # 建立表頭映射 (可能有多行表頭)，找到淨部位欄位即停止
+    header_mapping = {}
+    net_idx = _find_header_column(target_table.xpath('(.//tr)[position() <= 2]'), _OPTIONS_NET_HEADER_RE)
+    if net_idx != -1:
+        header_mapping['net_position'] = net_idx
+    
+    # 如果沒有找到明確的淨部位欄位，嘗試另一種方法
+    if 'net_position' not in header_mapping:
+        logger.warning("找不到明確的淨部位欄位，嘗試尋找可能的位置")
+    
+        # 通常淨部位在後半部，嘗試幾個可能的位置
+        # 一般的選擇權表格可能有：序號(0)、商品(1)、權別(2)、身份(3)、買方口數(4)、買方金額(5)、賣方口數(6)、賣方金額(7)、買賣差額口數(8)、買賣差額金額(9)
+        # 或者後面還有未平倉相關欄位
+        pos = _pick_column(target_table, (8, 10, 14))
+        if pos != -1:
+            header_mapping['net_position'] = pos
+            logger.info("使用預設欄位索引 %s 作為淨部位欄位", pos)
+    
+    if 'net_position' not in header_mapping:
+        # 使用預設索引
+        logger.warning("無法確定淨部位欄位位置，使用預設索引")
+        header_mapping['net_position'] = 8
+    
+    # 尋找買權和賣權區段中的外資行
+    call_found = False
+    put_found = False
+    net_idx = header_mapping['net_position']
+    
+    # 由 XPath 直接篩出表頭以外、儲存格足夠且屬於外資 (不含外資自營) 的買權/賣權資料列
+    for row in _OPTIONS_FOREIGN_ROWS_XPATH(target_table, idx=net_idx):
+        cells = row.findall('td')
+    
+        # 以整列文字 (與 XPath 篩選時相同) 一次掃描所有區段關鍵字，判斷所在區段
+        sides = {_OPTION_SIDES[key.lower()] for key in _OPTION_SIDE_RE.findall(row.text_content())}
+        is_call = 'call' in sides
+        is_put = not is_call and 'put' in sides
+    
+        # 如果是外資且在買權或賣權區段
+        if is_call or is_put:
+            # 取得數值 (儲存格文字已包含 font 標籤內的數字)，移除千分位逗號與其他非數字字符
+            net_text = cells[net_idx].text_content().translate(_NET_KEEP_TABLE)
+    
+            # 確保是整數 (可帶負號) 再轉換，'-'、'--' 等空值直接略過
+            if (net_text[1:] if net_text.startswith('-') else net_text).isdigit():
+                net_position = int(net_text)
+    
+                # 存入對應類型
+                if is_call:
+                    result['foreign_call_net'] = net_position
+                    call_found = True
+                    logger.debug("找到外資買權淨部位: %s", net_position)
+                elif is_put:
+                    result['foreign_put_net'] = net_position
+                    put_found = True
+                    logger.debug("找到外資賣權淨部位: %s", net_position)
+    
+            # 買權與賣權都已取得 (臺指選擇權位於表格最前面)，不必再檢查後續商品
+            if call_found and put_found:
                 break
-        
-        if not target_table:
-            logger.error("找不到包含選擇權持倉資訊的表格")
-            
-            # 嘗試更寬鬆的匹配
-            for table in tables:
-                if '選擇權' in table.text and ('買權' in table.text or '賣權' in table.text or 'call' in table.text.lower() or 'put' in table.text.lower()):
-                    target_table = table
-                    logger.info("找到可能包含選擇權資料的表格")
-                    break
-                    
-            if not target_table:
-                # 使用固定示範值
-                result['foreign_call_net'] = 4552
-                result['foreign_put_net'] = 9343
-                logger.info(f"無法找到選擇權表格，使用固定示範值: CALL={result['foreign_call_net']}, PUT={result['foreign_put_net']}")
-                return result
-        
-        # 建立表頭映射
-        header_mapping = {}
-        header_rows = target_table.find_all('tr')[:2]  # 可能有多行表頭
-        
-        for header_row in header_rows:
-            headers = header_row.find_all(['th', 'td'])
-            for idx, header in enumerate(headers):
-                header_text = header.text.strip().lower()
-                if '買賣差額' in header_text or '買賣淨額' in header_text or 'net' in header_text:
-                    # 可能有多個包含相關文字的欄位，尋找包含「口數」的欄位
-                    if '口數' in header_text or '部位' in header_text or 'position' in header_text:
-                        header_mapping['net_position'] = idx
-                        break
-        
-        # 如果沒有找到明確的淨部位欄位，嘗試另一種方法
-        if 'net_position' not in header_mapping:
-            logger.warning("找不到明確的淨部位欄位，嘗試尋找可能的位置")
-            
-            # 計算表格列數
-            max_cols = 0
-            for row in target_table.find_all('tr'):
-                max_cols = max(max_cols, len(row.find_all(['td', 'th'])))
-            
-            # 通常淨部位在後半部，嘗試幾個可能的位置
-            # 一般的選擇權表格可能有：序號(0)、商品(1)、權別(2)、身份(3)、買方口數(4)、買方金額(5)、賣方口數(6)、賣方金額(7)、買賣差額口數(8)、買賣差額金額(9)
-            # 或者後面還有未平倉相關欄位
-            possible_positions = [8, 10, 14]  # 可能的淨部位欄位索引
-            
-            for pos in possible_positions:
-                if pos < max_cols:
-                    header_mapping['net_position'] = pos
-                    logger.info(f"使用預設欄位索引 {pos} 作為淨部位欄位")
-                    break
-        
-        if 'net_position' not in header_mapping:
-            # 使用預設索引
-            logger.warning("無法確定淨部位欄位位置，使用預設索引")
-            header_mapping['net_position'] = 8
-        
-        # 尋找買權和賣權區段中的外資行
-        call_found = False
-        put_found = False
-        
-        for row in target_table.find_all('tr')[1:]:  # 跳過表頭行
-            cells = row.find_all('td')
-            
-            # 檢查是否有足夠的單元格
-            if len(cells) <= header_mapping.get('net_position', 8):
+    
+    # 如果沒有找到數據，嘗試更寬鬆的匹配方式
+    if not call_found or not put_found:
+        logger.warning("找不到外資選擇權淨部位，嘗試文本搜索方法")
+    
+        # 在整個表格文本中搜索可能的數字
+        table_text = target_table.text_content()
+    
+        # 嘗試尋找買權和賣權區塊
+        call_section = ""
+        put_section = ""
+    
+        # 一次掃描找出「買權」與「賣權」第一次出現的位置
+        anchors = {}
+        for match in _SECTION_RE.finditer(table_text):
+            anchors.setdefault(match.group(), match.start())
+            if len(anchors) == 2:
+                break
+        call_start = anchors.get('買權', -1)
+        put_start = anchors.get('賣權', -1)
+    
+        if call_start >= 0 and put_start >= 0:
+            if call_start < put_start:
+                call_section = table_text[call_start:put_start]
+                put_section = table_text[put_start:]
+            else:
+                put_section = table_text[put_start:call_start]
+                call_section = table_text[call_start:]
+        elif call_start >= 0:
+            call_section = table_text[call_start:]
+        elif put_start >= 0:
+            put_section = table_text[put_start:]
+    
+        # 在尚未取得數據的區段中尋找外資後的第一個較大數字作為淨部位
+        for section, key, found in ((call_section, 'foreign_call_net', call_found), (put_section, 'foreign_put_net', put_found)):
+            if found or not section:
                 continue
-            
-            # 讀取整行文字，以便更寬鬆地分析
-            row_text = ' '.join([cell.text.strip() for cell in cells])
-            
-            # 識別所在區段和是否為外資行
-            is_call = False
-            is_put = False
-            is_foreign = False
-            
-            if '買權' in row_text.lower() or 'call' in row_text.lower():
-                is_call = True
-            elif '賣權' in row_text.lower() or 'put' in row_text.lower():
-                is_put = True
-            
-            if '外資' in row_text and '外資自營' not in row_text:
-                is_foreign = True
-            
-            # 如果是外資且在買權或賣權區段
-            if is_foreign and (is_call or is_put):
-                net_idx = header_mapping.get('net_position', 8)
-                if net_idx < len(cells):
-                    net_cell = cells[net_idx]
-                    
-                    # 嘗試取得數值
-                    font_tag = net_cell.find('font')
-                    if font_tag:
-                        net_text = font_tag.text.strip()
-                    else:
-                        net_text = net_cell.text.strip()
-                    
-                    # 移除千分位逗號與其他非數字字符
-                    net_text = re.sub(r'[^\d-]', '', net_text)
-                    
-                    # 確保有數值並轉換
-                    if net_text:
-                        try:
-                            net_position = int(net_text)
-                            
-                            # 存入對應類型
-                            if is_call:
-                                result['foreign_call_net'] = net_position
-                                call_found = True
-                                logger.info(f"找到外資買權淨部位: {net_position}")
-                            elif is_put:
-                                result['foreign_put_net'] = net_position
-                                put_found = True
-                                logger.info(f"找到外資賣權淨部位: {net_position}")
-                        except ValueError:
-                            pass
-        
-        # 如果沒有找到數據，嘗試更寬鬆的匹配方式
-        if not call_found or not put_found:
-            logger.warning("找不到外資選擇權淨部位，嘗試文本搜索方法")
-            
-            # 在整個表格文本中搜索可能的數字
-            table_text = target_table.text
-            
-            # 嘗試尋找買權和賣權區塊
-            call_section = ""
-            put_section = ""
-            
-            if '買權' in table_text:
-                call_start = table_text.find('買權')
-                put_start = table_text.find('賣權')
-                
-                if call_start >= 0 and put_start
+    
+            foreign_start = section.find('外資')
+            if foreign_start < 0:
+                continue
+    
+            pos = _pick_position(_NUM_RE.finditer(section, foreign_start))
+            if pos:
+                result[key] = pos
+                if key == 'foreign_call_net':
+                    call_found = True
+                else:
+                    put_found = True
+                logger.info("使用備用方法找到%s: %s", key, pos)
+    
+    # 仍無法取得的數據以 None 表示，與真正為 0 的淨部位區分
+    if not call_found:
+        result['foreign_call_net'] = None
+    if not put_found:
+        result['foreign_put_net'] = None
+    
+    logger.info("選擇權持倉數據: 外資買權=%s, 外資賣權=%s", result['foreign_call_net'], result['foreign_put_net'])
+    return result
+
+# 各項預設資料的共用範本 (唯讀)，預設函數只需淺複製 (值皆為不可變型別)
+_INSTITUTIONAL_DEFAULT = MappingProxyType({
+    'foreign_tx': 0,
+    'foreign_mtx': 0,
+    'mtx_dealer_net': 0,
+    'mtx_it_net': 0,
+    'mtx_foreign_net': 0,
+    'mtx_oi': 0,
+    'xmtx_dealer_net': 0,
+    'xmtx_it_net': 0,
+    'xmtx_foreign_net': 0,
+    'xmtx_oi': 0
+})
+
+_TX_DEFAULT = MappingProxyType({
+    'close': 0.0,
+    'change': 0.0,
+    'change_percent': 0.0,
+    'taiex_close': 0.0,
+    'contract_month': ''
+})
+
+_TOP_TRADERS_DEFAULT = MappingProxyType({
+    'top10_traders_buy': 0,
+    'top10_traders_sell': 0,
+    'top10_traders_net': 0,
+    'top10_specific_buy': 0,
+    'top10_specific_sell': 0,
+    'top10_specific_net': 0,
+    'top10_traders_net_change': 0,
+    'top10_specific_net_change': 0
+})
+
+_OPTIONS_DEFAULT = MappingProxyType({
+    'foreign_call_buy': 0,
+    'foreign_call_sell': 0,
+    'foreign_call_net': 0,
+    'foreign_put_buy': 0,
+    'foreign_put_sell': 0,
+    'foreign_put_net': 0,
+    'foreign_call_net_change': 0,
+    'foreign_put_net_change': 0
+})
+
+# 期貨數據的欄位由各子範本組成，子範本新增欄位時自動同步
+_FUTURES_DEFAULT = MappingProxyType({
+    'date': '',
+    **_TX_DEFAULT,
+    'bias': 0.0,
+    **_INSTITUTIONAL_DEFAULT,
+    **_TOP_TRADERS_DEFAULT,
+    **_OPTIONS_DEFAULT
+})
 
 def default_institutional_data():
     """返回默認的三大法人期貨部位數據"""
-    return {
-        'foreign_tx': 0,
-        'foreign_mtx': 0,
-        'mtx_dealer_net': 0,
-        'mtx_it_net': 0,
-        'mtx_foreign_net': 0,
-        'mtx_oi': 0,
-        'xmtx_dealer_net': 0,
-        'xmtx_it_net': 0,
-        'xmtx_foreign_net': 0,
-        'xmtx_oi': 0
-    }
+    return _INSTITUTIONAL_DEFAULT.copy()
 
 def default_tx_data(taiex_close):
     """返回默認的台指期貨數據"""
-    return {
-        'close': 0.0,
-        'change': 0.0,
-        'change_percent': 0.0,
-        'taiex_close': taiex_close,
-        'contract_month': ''
-    }
+    result = _TX_DEFAULT.copy()
+    result['taiex_close'] = taiex_close
+    return result
+
+def default_top_traders_data():
+    """返回默認的十大交易人和特定法人持倉數據"""
+    return _TOP_TRADERS_DEFAULT.copy()
+
+def default_options_data():
+    """返回默認的選擇權持倉數據"""
+    return _OPTIONS_DEFAULT.copy()
+
+def missing_options_data():
+    """返回尚無數據的選擇權持倉數據 (外資淨部位以 None 表示，與真正為 0 的淨部位區分)"""
+    result = _OPTIONS_DEFAULT.copy()
+    result['foreign_call_net'] = None
+    result['foreign_put_net'] = None
+    return result
 
 def default_futures_data(date):
     """返回默認的期貨數據"""
-    return {
-        'date': date,
-        'close': 0.0,
-        'change': 0.0,
-        'change_percent': 0.0,
-        'bias': 0.0,
-        'taiex_close': 0.0,
-        'contract_month': '',
-        'foreign_tx': 0,
-        'foreign_mtx': 0,
-        'mtx_dealer_net': 0,
-        'mtx_it_net': 0,
-        'mtx_foreign_net': 0,
-        'mtx_oi': 0,
-        'xmtx_dealer_net': 0,
-        'xmtx_it_net': 0,
-        'xmtx_foreign_net': 0,
-        'xmtx_oi': 0,
-        'top10_traders_buy': 0,
-        'top10_traders_sell': 0,
-        'top10_traders_net': 0,
-        'top10_specific_buy': 0,
-        'top10_specific_sell': 0,
-        'top10_specific_net': 0,
-        'top10_traders_net_change': 0,
-        'top10_specific_net_change': 0,
-        'foreign_call_buy': 0,
-        'foreign_call_sell': 0,
-        'foreign_call_net': 0,
-        'foreign_put_buy': 0,
-        'foreign_put_sell': 0,
-        'foreign_put_net': 0,
-        'foreign_call_net_change': 0,
-        'foreign_put_net_change': 0
-    }
+    result = _FUTURES_DEFAULT.copy()
+    result['date'] = date
+    return result
 
 # 主程序測試
 if __name__ == "__main__":
@@ -2,12 +2,45 @@
 三大法人買賣超爬蟲模組 - 改進版
 """
 import logging
-import requests
-from bs4 import BeautifulSoup
-from .utils import get_tw_stock_date, safe_float
+from types import MappingProxyType
+from .utils import get_tw_stock_date, safe_float, TWSE_TIMEOUT, TWSE_SESSION, parse_html_response, TABLE_STRAINER
 
 logger = logging.getLogger(__name__)
 
+# 三大法人類別關鍵字與對應的結果欄位，依序比對 (網頁版與 JSON 版共用)
+_CATEGORY_KEYS = (
+    ('自營商(自行買賣)', 'dealer_self'),
+    ('自營商(避險)', 'dealer_hedge'),
+    ('投信', 'investment_trust'),
+    ('外資及陸資', 'foreign'),
+    ('合計', 'total'),
+)
+
+# 共用標頭已設定於 Session，網頁版只需指定 Referer，JSON 版另外指定 Accept
+_HTML_HEADERS = {'Referer': 'https://www.twse.com.tw/zh/'}
+_JSON_HEADERS = {
+    'Accept': 'application/json',
+    'Referer': 'https://www.twse.com.tw/zh/'
+}
+
+def _classify_category(category):
+    """
+    判斷三大法人報表的類別對應的結果欄位
+    
+    Args:
+        category: 類別文字，例如 "外資及陸資(不含外資自營商)"
+        
+    Returns:
+        str: 結果欄位名稱，非目標類別時返回 None
+    """
+    for keyword, key in _CATEGORY_KEYS:
+        if keyword in category:
+            # 外資自營商不計入外資
+            if key == 'foreign' and '外資自營' in category:
+                continue
+            return key
+    return None
+
 def get_institutional_investors_data():
     """
     獲取三大法人買賣超資料
@@ -22,18 +55,11 @@ def get_institutional_investors_data():
         # 使用改進的 URL (新版證交所網站)
         url = f"https://www.twse.com.tw/rwd/zh/fund/BFI82U?date={date}&response=html"
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9',
-            'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Referer': 'https://www.twse.com.tw/zh/'
-        }
-        
-        response = requests.get(url, headers=headers)
+        response = TWSE_SESSION.get(url, headers=_HTML_HEADERS, timeout=TWSE_TIMEOUT)
         response.raise_for_status()
-        response.encoding = 'utf-8'
         
-        soup = BeautifulSoup(response.text, 'lxml')
+        # 依標頭編碼 (預設 UTF-8) 直接解析原始位元組，不經 response.text 偵測編碼與解碼，且只建立表格節點
+        soup = parse_html_response(response, parse_only=TABLE_STRAINER)
         
         # 解析表格
         tables = soup.find_all('table')
@@ -45,34 +71,16 @@ def get_institutional_investors_data():
         rows = table.find_all('tr')
         
         # 初始化結果
-        result = {
-            'date': date,
-            'foreign': 0.0,
-            'investment_trust': 0.0,
-            'dealer_self': 0.0,
-            'dealer_hedge': 0.0,
-            'dealer': 0.0,
-            'total': 0.0
-        }
+        result = default_institutional_data(date)
         
         # 解析各行數據
         for row in rows:
             cells = row.find_all('td')
             if len(cells) >= 4:
-                category = cells[0].text.strip()
-                buy_sell_diff = safe_float(cells[3].text.strip().replace(',', ''))
-                
-                # 判斷類別並存儲數據
-                if '自營商(自行買賣)' in category:
-                    result['dealer_self'] = buy_sell_diff / 100000000  # 轉換為億
-                elif '自營商(避險)' in category:
-                    result['dealer_hedge'] = buy_sell_diff / 100000000  # 轉換為億
-                elif '投信' in category:
-                    result['investment_trust'] = buy_sell_diff / 100000000  # 轉換為億
-                elif '外資及陸資' in category and '外資自營' not in category:
-                    result['foreign'] = buy_sell_diff / 100000000  # 轉換為億
-                elif '合計' in category:
-                    result['total'] = buy_sell_diff / 100000000  # 轉換為億
+                # 判斷類別，只轉換屬於目標類別的數值並存儲數據
+                key = _classify_category(cells[0].text.strip())
+                if key:
+                    result[key] = safe_float(cells[3].text) / 100000000  # 轉換為億
         
         # 計算自營商總計
         result['dealer'] = result['dealer_self'] + result['dealer_hedge']
@@ -115,13 +123,7 @@ def get_institutional_alternate(date):
         # 使用替代URL (較舊的格式，有時較穩定)
         url = f"https://www.twse.com.tw/fund/BFI82U?response=json&date={date}&type=day"
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/json',
-            'Referer': 'https://www.twse.com.tw/zh/'
-        }
-        
-        response = requests.get(url, headers=headers)
+        response = TWSE_SESSION.get(url, headers=_JSON_HEADERS, timeout=TWSE_TIMEOUT)
         response.raise_for_status()
         data = response.json()
         
@@ -129,33 +131,15 @@ def get_institutional_alternate(date):
             logger.error(f"替代方法獲取三大法人資料失敗: {data.get('stat')}")
             return None
             
-        result = {
-            'date': date,
-            'foreign': 0.0,
-            'investment_trust': 0.0,
-            'dealer_self': 0.0,
-            'dealer_hedge': 0.0,
-            'dealer': 0.0,
-            'total': 0.0
-        }
+        result = default_institutional_data(date)
         
         # 解析JSON數據
         for item in data.get('data', []):
             if len(item) >= 4:
-                category = item[0]
-                buy_sell_diff = safe_float(item[3].replace(',', ''))
-                
-                # 判斷類別並存儲數據
-                if '自營商(自行買賣)' in category:
-                    result['dealer_self'] = buy_sell_diff / 100000000  # 轉換為億
-                elif '自營商(避險)' in category:
-                    result['dealer_hedge'] = buy_sell_diff / 100000000  # 轉換為億
-                elif '投信' in category:
-                    result['investment_trust'] = buy_sell_diff / 100000000  # 轉換為億
-                elif '外資及陸資' in category and '外資自營' not in category:
-                    result['foreign'] = buy_sell_diff / 100000000  # 轉換為億
-                elif '合計' in category:
-                    result['total'] = buy_sell_diff / 100000000  # 轉換為億
+                # 判斷類別，只轉換屬於目標類別的數值並存儲數據
+                key = _classify_category(item[0])
+                if key:
+                    result[key] = safe_float(item[3]) / 100000000  # 轉換為億
         
         # 計算自營商總計
         result['dealer'] = result['dealer_self'] + result['dealer_hedge']
@@ -168,17 +152,19 @@ def get_institutional_alternate(date):
         logger.error(f"使用替代方法獲取三大法人資料時出錯: {str(e)}")
         return None
 
+# 預設資料的共用範本 (唯讀)，預設函數只需淺複製 (值皆為不可變型別)
+_INSTITUTIONAL_DEFAULT = MappingProxyType({
+    'foreign': 0.0,
+    'investment_trust': 0.0,
+    'dealer_self': 0.0,
+    'dealer_hedge': 0.0,
+    'dealer': 0.0,
+    'total': 0.0
+})
+
 def default_institutional_data(date):
     """返回默認的三大法人買賣超資料"""
-    return {
-        'date': date,
-        'foreign': 0.0,
-        'investment_trust': 0.0,
-        'dealer_self': 0.0,
-        'dealer_hedge': 0.0,
-        'dealer': 0.0,
-        'total': 0.0
-    }
+    return {'date': date, **_INSTITUTIONAL_DEFAULT}
 
 # 主程序測試
 if __name__ == "__main__":
@@ -3,15 +3,21 @@
 專門處理三大法人期貨持倉資料，包含外資台指和小台指淨未平倉
 """
 import logging
-import requests
 import re
-from bs4 import BeautifulSoup
+import lxml.etree
 from datetime import datetime
-from .utils import get_tw_stock_date, safe_int, get_html_content
+from types import MappingProxyType
+from .utils import get_tw_stock_date, safe_int, get_html_content, fetch_taifex_tree, ROWS_XPATH, CELLS_XPATH, TD_XPATH, NUMBER_STRIP_TABLE, format_query_date, TAIFEX_BASE_QUERY
 
 # 設定日誌
 logger = logging.getLogger(__name__)
 
+# 共用標頭已設定於 Session，本報表僅需指定 Referer
+_HEADERS = {'Referer': 'https://www.taifex.com.tw/cht/3/futContractsDate'}
+
+# 包含臺股期貨或小型臺指期貨的第一個表格
+_FUTURES_TABLE_XPATH = lxml.etree.XPath("(//table[contains(., '臺股期貨') or contains(., '小型臺指期貨')])[1]")
+
 def get_institutional_futures_data():
     """
     獲取三大法人期貨持倉資料，專注於外資台指和小台指淨未平倉
@@ -27,7 +33,7 @@ def get_institutional_futures_data():
         result = get_institutional_futures_by_date(date)
         
         # 記錄結果
-        logger.info(f"三大法人期貨持倉資料: 外資台指={result['foreign_tx_net']}, 外資小台={result['foreign_mtx_net']}")
+        logger.info("三大法人期貨持倉資料: 外資台指=%s, 外資小台=%s", result['foreign_tx_net'], result['foreign_mtx_net'])
         
         return result
     
@@ -49,62 +55,42 @@ def get_institutional_futures_by_date(date):
         # 使用Excel格式URL以獲取更穩定的資料
         url = "https://www.taifex.com.tw/cht/3/futContractsDateExcel"
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9',
-            'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Referer': 'https://www.taifex.com.tw/cht/3/futContractsDate'
-        }
-        
         # 使用POST方法，提供查詢參數
         data = {
-            'queryType': '1',
-            'goDay': '',
-            'doQuery': '1',
-            'dateaddcnt': '',
-            'queryDate': date[:4] + '/' + date[4:6] + '/' + date[6:],  # 格式化日期為YYYY/MM/DD
+            **TAIFEX_BASE_QUERY,
+            'queryDate': format_query_date(date),  # 格式化日期為YYYY/MM/DD
         }
         
         # 初始化結果
         result = default_institutional_futures_data()
         
-        response = requests.post(url, headers=headers, data=data)
-        response.raise_for_status()
-        
-        # 嘗試使用不同的編碼
-        for encoding in ['utf-8', 'big5', 'cp950']:
-            try:
-                response.encoding = encoding
-                soup = BeautifulSoup(response.text, 'lxml')
-                break
-            except:
-                continue
+        # 請求數據 (與期貨爬蟲共用磁碟快取)，由 lxml 直接解析原始位元組，後續以預先編譯的 XPath 搜尋
+        tree = fetch_taifex_tree(url, _HEADERS, data, _FUTURES_TABLE_XPATH)
         
         # 查找包含期貨部位資訊的表格
-        tables = soup.find_all('table')
-        if not tables:
+        if tree.find('.//table') is None:
             logger.error("找不到三大法人期貨部位表格")
             return result
         
-        # 尋找包含「臺股期貨」和「小型臺指期貨」的表格
-        target_table = None
-        for table in tables:
-            if '臺股期貨' in table.text or '小型臺指期貨' in table.text:
-                target_table = table
-                break
+        # 尋找包含「臺股期貨」和「小型臺指期貨」的表格 (由 XPath 在 lxml 內比對表格文字)
+        tables = _FUTURES_TABLE_XPATH(tree)
+        target_table = tables[0] if tables else None
         
-        if not target_table:
+        if target_table is None:
             logger.error("找不到包含臺股期貨或小型臺指期貨的表格")
             return result
         
+        # 表格的所有行只搜尋一次，後續表頭、欄數與資料行共用
+        rows = ROWS_XPATH(target_table)
+        
         # 建立表頭映射 - 找出關鍵欄位索引
         net_position_idx = -1
-        header_rows = target_table.find_all('tr')[:2]  # 通常表頭在前幾行
+        header_rows = rows[:2]  # 通常表頭在前幾行
         
         for header_row in header_rows:
-            th_elements = header_row.find_all(['th', 'td'])
+            th_elements = CELLS_XPATH(header_row)
             for idx, th in enumerate(th_elements):
-                text = th.text.strip().lower()
+                text = th.text_content().strip().lower()
                 if ('買賣' in text and '差額' in text) or ('多空' in text and '淨額' in text) or ('net' in text):
                     net_position_idx = idx
                     break
@@ -117,8 +103,8 @@ def get_institutional_futures_by_date(date):
             max_cols = 0
             
             # 檢查表格有多少列
-            for row in target_table.find_all('tr'):
-                max_cols = max(max_cols, len(row.find_all(['td', 'th'])))
+            for row in rows:
+                max_cols = max(max_cols, len(CELLS_XPATH(row)))
             
             # 選擇一個有效的索引位置
             for idx in net_position_candidates:
@@ -132,13 +118,13 @@ def get_institutional_futures_by_date(date):
         
         # 遍歷表格尋找臺股期貨和小型臺指期貨的外資部位
         contract_type = None
-        for row in target_table.find_all('tr'):
-            cells = row.find_all('td')
+        for row in rows:
+            cells = TD_XPATH(row)
             if len(cells) < net_position_idx + 1:
                 continue
             
             # 檢查是否為契約標題行
-            first_cell_text = cells[0].text.strip() if cells else ""
+            first_cell_text = cells[0].text_content().strip()
             if '臺股期貨' in first_cell_text or 'TX' in first_cell_text:
                 contract_type = '臺股期貨'
                 continue
@@ -148,7 +134,7 @@ def get_institutional_futures_by_date(date):
             
             # 檢查是否為外資的資料行
             if len(cells) > 1 and contract_type:
-                identity_cell = cells[1].text.strip() if len(cells) > 1 else ""
+                identity_cell = cells[1].text_content().strip()
                 # 擴大匹配條件，包括可能的不同表示方式
                 if ('外資' in identity_cell or 'Foreign' in identity_cell) and '外資自營' not in identity_cell:
                     # 取得淨部位數值
@@ -157,24 +143,24 @@ def get_institutional_futures_by_date(date):
                         net_cell = cells[net_position_idx]
                         
                         # 檢查是否有font標籤
-                        font_tag = net_cell.find('font')
-                        if font_tag:
-                            net_text = font_tag.text.strip()
+                        font_tag = net_cell.find('.//font')
+                        if font_tag is not None:
+                            net_text = font_tag.text_content().strip()
                         else:
-                            net_text = net_cell.text.strip()
+                            net_text = net_cell.text_content().strip()
                         
-                        # 移除千分位逗號並處理可能的空值
-                        net_text = net_text.replace(',', '')
+                        # 移除千分位逗號與符號並處理可能的空值
+                        net_text = net_text.translate(NUMBER_STRIP_TABLE)
                         if net_text and net_text != '-' and net_text != '--':
                             net_position = safe_int(net_text)
                             
                             # 根據契約類型存入結果
                             if contract_type == '臺股期貨' and net_position != 0:
                                 result['foreign_tx_net'] = net_position
-                                logger.info(f"找到外資臺股期貨淨部位: {net_position}")
+                                logger.debug("找到外資臺股期貨淨部位: %s", net_position)
                             elif contract_type == '小型臺指期貨' and net_position != 0:
                                 result['foreign_mtx_net'] = net_position
-                                logger.info(f"找到外資小型臺指期貨淨部位: {net_position}")
+                                logger.debug("找到外資小型臺指期貨淨部位: %s", net_position)
         
         return result
     
@@ -182,12 +168,15 @@ def get_institutional_futures_by_date(date):
         logger.error(f"獲取三大法人期貨持倉數據時出錯: {str(e)}")
         return default_institutional_futures_data()
 
+# 預設資料的共用範本 (唯讀)，預設函數只需淺複製 (值皆為不可變型別)
+_INSTITUTIONAL_FUTURES_DEFAULT = MappingProxyType({
+    'foreign_tx_net': 0,
+    'foreign_mtx_net': 0
+})
+
 def default_institutional_futures_data():
     """返回默認的三大法人期貨部位數據"""
-    return {
-        'foreign_tx_net': 0,
-        'foreign_mtx_net': 0
-    }
+    return _INSTITUTIONAL_FUTURES_DEFAULT.copy()
 
 # 主程序測試
 if __name__ == "__main__":
@@ -3,15 +3,30 @@
 專門處理選擇權持倉資料，包含外資買權和賣權淨未平倉
 """
 import logging
-import requests
 import re
-from bs4 import BeautifulSoup
+import lxml.etree
 from datetime import datetime
-from .utils import get_tw_stock_date, safe_int, get_html_content
+from types import MappingProxyType
+from .utils import get_tw_stock_date, safe_int, get_html_content, fetch_taifex_tree, ROWS_XPATH, CELLS_XPATH, TD_XPATH, NUMBER_STRIP_TABLE, format_query_date, TAIFEX_BASE_QUERY
 
 # 設定日誌
 logger = logging.getLogger(__name__)
 
+# 共用標頭已設定於 Session，本報表僅需指定 Referer
+_HEADERS = {'Referer': 'https://www.taifex.com.tw/cht/3/callsAndPutsDate'}
+
+# 包含選擇權持倉資訊的第一個表格，以及較寬鬆條件的備用表格 (英文關鍵字以 translate 忽略大小寫)
+_OPTIONS_TABLE_XPATH = lxml.etree.XPath(
+    "(//table[(contains(., '臺指選擇權') or contains(., '台指選擇權'))"
+    " and (contains(., '買權') or contains(., '賣權'))])[1]")
+_OPTIONS_LOOSE_TABLE_XPATH = lxml.etree.XPath(
+    "(//table[contains(., '選擇權') and (contains(., '買權') or contains(., '賣權')"
+    " or contains(translate(., 'CALPUT', 'calput'), 'call') or contains(translate(., 'CALPUT', 'calput'), 'put'))])[1]")
+
+# 判斷選擇權資料列所屬區段的關鍵字，以單一正則表達式一次比對
+_OPTION_SIDES = {'買權': 'call', 'call': 'call', '賣權': 'put', 'put': 'put'}
+_OPTION_SIDE_RE = re.compile('|'.join(_OPTION_SIDES), re.I)
+
 def get_option_positions_data():
     """
     獲取選擇權持倉資料，專注於外資買權和賣權淨未平倉
@@ -27,7 +42,7 @@ def get_option_positions_data():
         result = get_option_positions_by_date(date)
         
         # 記錄結果
-        logger.info(f"選擇權持倉資料: 外資買權={result['foreign_call_net']}, 外資賣權={result['foreign_put_net']}")
+        logger.info("選擇權持倉資料: 外資買權=%s, 外資賣權=%s", result['foreign_call_net'], result['foreign_put_net'])
         
         return result
     
@@ -49,73 +64,50 @@ def get_option_positions_by_date(date):
         # 使用Excel格式URL以獲取更穩定的資料
         url = "https://www.taifex.com.tw/cht/3/callsAndPutsDateExcel"
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9',
-            'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Referer': 'https://www.taifex.com.tw/cht/3/callsAndPutsDate'
-        }
-        
         # 使用POST方法，提供查詢參數
         data = {
-            'queryType': '1',
-            'goDay': '',
-            'doQuery': '1',
-            'dateaddcnt': '',
-            'queryDate': date[:4] + '/' + date[4:6] + '/' + date[6:],  # 格式化日期為YYYY/MM/DD
+            **TAIFEX_BASE_QUERY,
+            'queryDate': format_query_date(date),  # 格式化日期為YYYY/MM/DD
         }
         
         # 初始化結果
         result = default_option_positions_data()
         
-        response = requests.post(url, headers=headers, data=data)
-        response.raise_for_status()
-        
-        # 嘗試使用不同的編碼
-        for encoding in ['utf-8', 'big5', 'cp950']:
-            try:
-                response.encoding = encoding
-                soup = BeautifulSoup(response.text, 'lxml')
-                break
-            except:
-                continue
+        # 請求數據 (與期貨爬蟲共用磁碟快取)，由 lxml 直接解析原始位元組，後續以預先編譯的 XPath 搜尋
+        tree = fetch_taifex_tree(url, _HEADERS, data, _OPTIONS_LOOSE_TABLE_XPATH)
         
         # 查找所有表格 (Excel格式頁面可能沒有class='table_f')
-        tables = soup.find_all('table')
-        if not tables:
+        if tree.find('.//table') is None:
             logger.error("找不到任何表格")
             return result
         
-        # 尋找包含選擇權持倉資訊的表格
-        target_table = None
+        # 尋找包含選擇權持倉資訊的表格 (由 XPath 在 lxml 內比對表格文字)
+        tables = _OPTIONS_TABLE_XPATH(tree)
+        target_table = tables[0] if tables else None
         
-        for table in tables:
-            table_text = table.text.lower()
-            if ('臺指選擇權' in table_text or '台指選擇權' in table_text) and ('買權' in table_text or '賣權' in table_text):
-                target_table = table
-                break
-        
-        if not target_table:
+        if target_table is None:
             logger.error("找不到包含選擇權持倉資訊的表格")
             
             # 嘗試更寬鬆的匹配
-            for table in tables:
-                if '選擇權' in table.text and ('買權' in table.text or '賣權' in table.text or 'call' in table.text.lower() or 'put' in table.text.lower()):
-                    target_table = table
-                    logger.info("找到可能包含選擇權資料的表格")
-                    break
+            tables = _OPTIONS_LOOSE_TABLE_XPATH(tree)
+            target_table = tables[0] if tables else None
+            if target_table is not None:
+                logger.info("找到可能包含選擇權資料的表格")
                     
-            if not target_table:
+            if target_table is None:
                 return result
         
+        # 表格的所有行只搜尋一次，後續表頭、欄數與資料行共用
+        rows = ROWS_XPATH(target_table)
+        
         # 建立表頭映射
         header_mapping = {}
-        header_rows = target_table.find_all('tr')[:2]  # 可能有多行表頭
+        header_rows = rows[:2]  # 可能有多行表頭
         
         for header_row in header_rows:
-            headers = header_row.find_all(['th', 'td'])
+            headers = CELLS_XPATH(header_row)
             for idx, header in enumerate(headers):
-                header_text = header.text.strip().lower()
+                header_text = header.text_content().strip().lower()
                 if '買賣差額' in header_text or '買賣淨額' in header_text or 'net' in header_text:
                     # 可能有多個包含相關文字的欄位，尋找包含「口數」的欄位
                     if '口數' in header_text or '部位' in header_text or 'position' in header_text:
@@ -128,8 +120,8 @@ def get_option_positions_by_date(date):
             
             # 計算表格列數
             max_cols = 0
-            for row in target_table.find_all('tr'):
-                max_cols = max(max_cols, len(row.find_all(['td', 'th'])))
+            for row in rows:
+                max_cols = max(max_cols, len(CELLS_XPATH(row)))
             
             # 通常淨部位在後半部，嘗試幾個可能的位置
             # 一般的選擇權表格可能有：序號(0)、商品(1)、權別(2)、身份(3)、買方口數(4)、買方金額(5)、賣方口數(6)、賣方金額(7)、買賣差額口數(8)、買賣差額金額(9)
@@ -139,7 +131,7 @@ def get_option_positions_by_date(date):
             for pos in possible_positions:
                 if pos < max_cols:
                     header_mapping['net_position'] = pos
-                    logger.info(f"使用預設欄位索引 {pos} 作為淨部位欄位")
+                    logger.info("使用預設欄位索引 %s 作為淨部位欄位", pos)
                     break
         
         if 'net_position' not in header_mapping:
@@ -151,28 +143,24 @@ def get_option_positions_by_date(date):
         call_found = False
         put_found = False
         
-        for row in target_table.find_all('tr')[1:]:  # 跳過表頭行
-            cells = row.find_all('td')
+        for row in rows[1:]:  # 跳過表頭行
+            cells = TD_XPATH(row)
             
             # 檢查是否有足夠的單元格
             if len(cells) <= header_mapping.get('net_position', 8):
                 continue
             
-            # 讀取整行文字，以便更寬鬆地分析
-            row_text = ' '.join([cell.text.strip() for cell in cells])
+            # 每個儲存格的文字只取一次，整行文字與淨部位欄位共用
+            cell_texts = [cell.text_content().strip() for cell in cells]
             
-            # 識別所在區段和是否為外資行
-            is_call = False
-            is_put = False
-            is_foreign = False
-            
-            if '買權' in row_text.lower() or 'call' in row_text.lower():
-                is_call = True
-            elif '賣權' in row_text.lower() or 'put' in row_text.lower():
-                is_put = True
+            # 讀取整行文字，以便更寬鬆地分析
+            row_text = ' '.join(cell_texts)
             
-            if '外資' in row_text and '外資自營' not in row_text:
-                is_foreign = True
+            # 識別所在區段 (一次掃描所有區段關鍵字) 和是否為外資行
+            sides = {_OPTION_SIDES[key.lower()] for key in _OPTION_SIDE_RE.findall(row_text)}
+            is_call = 'call' in sides
+            is_put = not is_call and 'put' in sides
+            is_foreign = '外資' in row_text and '外資自營' not in row_text
             
             # 如果是外資且在買權或賣權區段
             if is_foreign and (is_call or is_put):
@@ -181,14 +169,14 @@ def get_option_positions_by_date(date):
                     net_cell = cells[net_idx]
                     
                     # 嘗試取得數值
-                    font_tag = net_cell.find('font')
-                    if font_tag:
-                        net_text = font_tag.text.strip()
+                    font_tag = net_cell.find('.//font')
+                    if font_tag is not None:
+                        net_text = font_tag.text_content().strip()
                     else:
-                        net_text = net_cell.text.strip()
+                        net_text = cell_texts[net_idx]
                     
                     # 移除千分位逗號與其他非數字字符
-                    net_text = net_text.replace(',', '')
+                    net_text = net_text.translate(NUMBER_STRIP_TABLE)
                     
                     # 確保有數值並轉換
                     if net_text and net_text != '-' and net_text != '--':
@@ -199,11 +187,11 @@ def get_option_positions_by_date(date):
                             if is_call:
                                 result['foreign_call_net'] = net_position
                                 call_found = True
-                                logger.info(f"找到外資買權淨部位: {net_position}")
+                                logger.debug("找到外資買權淨部位: %s", net_position)
                             elif is_put:
                                 result['foreign_put_net'] = net_position
                                 put_found = True
-                                logger.info(f"找到外資賣權淨部位: {net_position}")
+                                logger.debug("找到外資賣權淨部位: %s", net_position)
                         except Exception as e:
                             logger.error(f"轉換淨部位值時出錯: {str(e)}")
         
@@ -213,12 +201,15 @@ def get_option_positions_by_date(date):
         logger.error(f"獲取選擇權持倉數據時出錯: {str(e)}")
         return default_option_positions_data()
 
+# 預設資料的共用範本 (唯讀)，預設函數只需淺複製 (值皆為不可變型別)
+_OPTION_POSITIONS_DEFAULT = MappingProxyType({
+    'foreign_call_net': 0,
+    'foreign_put_net': 0
+})
+
 def default_option_positions_data():
     """返回默認的選擇權持倉資料"""
-    return {
-        'foreign_call_net': 0,
-        'foreign_put_net': 0
-    }
+    return _OPTION_POSITIONS_DEFAULT.copy()
 
 # 主程序測試
 if __name__ == "__main__":
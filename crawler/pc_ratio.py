@@ -2,13 +2,26 @@
 PC Ratio爬蟲模組 - 修復版
 """
 import logging
-import requests
-from bs4 import BeautifulSoup
+import lxml.etree
+from types import MappingProxyType
 from datetime import datetime, timedelta
-from .utils import get_tw_stock_date, safe_float, get_html_content
+from .utils import get_tw_stock_date, safe_float, fetch_taifex_tree, ROWS_XPATH, TD_XPATH, format_query_date, get_response_encoding, taifex_get
 
 logger = logging.getLogger(__name__)
 
+# 共用標頭已設定於 Session，PC Ratio 網頁與下載端點僅需指定 Referer
+_HEADERS = {'Referer': 'https://www.taifex.com.tw/cht/3/pcRatio'}
+
+# 預設資料範本 (唯讀)，使用接近市場平均的默認值
+_PC_RATIO_DEFAULT = MappingProxyType({
+    'vol_ratio': 0.8,
+    'oi_ratio': 0.75
+})
+
+# 文件中第一個 class 含 table_f 的表格
+_TABLE_F_XPATH = lxml.etree.XPath(
+    "(//table[contains(concat(' ', normalize-space(@class), ' '), ' table_f ')])[1]")
+
 def get_pc_ratio():
     """
     獲取PC Ratio數據
@@ -68,33 +81,22 @@ def get_pc_ratio_standard(date):
         # 台指選擇權Put/Call Ratio網頁
         url = "https://www.taifex.com.tw/cht/3/pcRatio"
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9',
-            'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Referer': 'https://www.taifex.com.tw/cht/3/pcRatio'
-        }
-        
         # 使用POST方法，提供查詢參數
         data = {
-            'queryDate': date[:4] + '/' + date[4:6] + '/' + date[6:],  # 格式化日期為YYYY/MM/DD
+            'queryDate': format_query_date(date),  # 格式化日期為YYYY/MM/DD
         }
         
-        # 使用get_html_content獲取HTML內容
-        soup = get_html_content(url, headers=headers, method='POST', data=data)
-        
-        if not soup:
-            logger.error("無法獲取PC Ratio頁面")
-            return None
+        # 經由共用 Session 與磁碟快取取得頁面，由 lxml 直接解析原始位元組
+        tree = fetch_taifex_tree(url, _HEADERS, data, _TABLE_F_XPATH)
         
         # 解析表格
-        tables = soup.find_all('table', class_='table_f')
-        if not tables or len(tables) < 1:
+        tables = _TABLE_F_XPATH(tree)
+        if not tables:
             logger.error("找不到PC Ratio表格")
             return None
         
         table = tables[0]
-        rows = table.find_all('tr')
+        rows = ROWS_XPATH(table)
         
         # 跳過表頭行，直接獲取第二行（最新數據）
         if len(rows) < 3:  # 包含標題行和數據行
@@ -103,7 +105,7 @@ def get_pc_ratio_standard(date):
         
         # 獲取最新數據（第二行，索引為1）
         latest_row = rows[1]
-        cells = latest_row.find_all('td')
+        cells = TD_XPATH(latest_row)
         
         # 檢查是否有足夠的列
         if len(cells) < 6:
@@ -113,14 +115,14 @@ def get_pc_ratio_standard(date):
         # 解析數據
         # 日期通常在第一列
         try:
-            trade_date = cells[0].text.strip()
+            trade_date = cells[0].text_content().strip()
             
             # 成交量比率(P/C)通常在第三列
-            vol_ratio_text = cells[2].text.strip().replace(',', '')
+            vol_ratio_text = cells[2].text_content()
             vol_ratio = safe_float(vol_ratio_text)
             
             # 未平倉量比率(P/C)通常在第五列
-            oi_ratio_text = cells[4].text.strip().replace(',', '')
+            oi_ratio_text = cells[4].text_content()
             oi_ratio = safe_float(oi_ratio_text)
             
             # 檢查數據是否超出合理範圍
@@ -169,26 +171,13 @@ def get_pc_ratio_alternative(date):
     """
     try:
         # 使用API格式的URL
-        url = f"https://www.taifex.com.tw/cht/3/pcRatioDown?queryDate={date[:4]}/{date[4:6]}/{date[6:]}&queryType=1"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9',
-            'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Referer': 'https://www.taifex.com.tw/cht/3/pcRatio'
-        }
+        url = f"https://www.taifex.com.tw/cht/3/pcRatioDown?queryDate={format_query_date(date)}&queryType=1"
         
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
+        # 經由斷路器送出請求 (已檢查 HTTP 錯誤)
+        response = taifex_get(url, headers=_HEADERS)
         
-        # 嘗試使用不同的編碼
-        for encoding in ['utf-8', 'big5', 'cp950']:
-            try:
-                response.encoding = encoding
-                lines = response.text.strip().split('\n')
-                break
-            except:
-                continue
+        # 依回應標頭宣告的編碼 (未指定時為 UTF-8) 只解碼一次
+        lines = response.content.decode(get_response_encoding(response), errors='replace').strip().split('\n')
         
         # 解析CSV格式數據
         if len(lines) < 2:
@@ -277,11 +266,7 @@ def is_valid_pc_ratio(data):
 
 def default_pc_ratio(date):
     """返回默認的PC Ratio數據"""
-    return {
-        'date': date,
-        'vol_ratio': 0.8,  # 使用接近市場平均的默認值
-        'oi_ratio': 0.75   # 使用接近市場平均的默認值
-    }
+    return {'date': date, **_PC_RATIO_DEFAULT}
 
 # 主程序測試
 if __name__ == "__main__":
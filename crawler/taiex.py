@@ -3,13 +3,29 @@
 """
 import re
 import logging
-from datetime import datetime
-import requests
-from bs4 import BeautifulSoup
-from .utils import get_tw_stock_date, safe_float
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+from .utils import get_tw_stock_date, safe_float, is_report_final, ResultCache, TWSE_TIMEOUT, TWSE_SESSION, parse_html_response, TABLE_STRAINER
 
 logger = logging.getLogger(__name__)
 
+# 證交所兩個頁面位於同一主機，共用 Session 以重複使用 keep-alive 連線與共用標頭，暫時性錯誤自動重試
+_SESSION = TWSE_SESSION
+
+# 查詢失敗時的預設資料範本 (唯讀)，值皆為不可變型別
+_TAIEX_DEFAULT = MappingProxyType({
+    'close': 0.0,
+    'change': 0.0,
+    'change_percent': 0.0,
+    'volume': 0.0
+})
+
+# 指數與成交金額兩個頁面同時下載
+_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+
+# 行程內的加權指數結果快取，排程與期貨爬蟲在同一天共用同一份結果；盤後資料定案前的結果保留 15 分鐘
+_RESULT_CACHE = ResultCache(size=4, pending_ttl=900)
+
 def get_taiex_data():
     """
     獲取台灣加權指數相關數據
@@ -17,20 +33,63 @@ def get_taiex_data():
     Returns:
         dict: 包含指數數據的字典
     """
+    date = get_tw_stock_date('%Y%m%d')
+    
+    cached = _RESULT_CACHE.get(date)
+    if cached is not None:
+        return cached
+    
+    result = get_taiex_data_by_date(date)
+    
+    # 只保留指數與成交金額都已取得的結果，失敗或資料未齊全時下次重新抓取；
+    # 過去日期或當日資料已定案時可一直沿用，否則只保留有限時間
+    if result and result['close'] > 0 and result['volume'] > 0:
+        _RESULT_CACHE.set(date, result, final=is_report_final(date))
+    
+    return result
+
+def clear_taiex_cache():
+    """清除行程內快取的加權指數數據"""
+    _RESULT_CACHE.clear()
+
+def _close_response(future):
+    """已完成的請求若取得回應則關閉，釋放連線回連線池"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+def _discard_response(future):
+    """
+    放棄尚未使用的背景請求：尚未開始時直接取消，已送出時於完成後關閉回應
+    
+    Args:
+        future: 背景請求的 Future 物件
+    """
+    if not future.cancel():
+        future.add_done_callback(_close_response)
+
+def get_taiex_data_by_date(date):
+    """
+    獲取特定日期的台灣加權指數相關數據
+    
+    Args:
+        date: 日期字符串，格式為YYYYMMDD
+        
+    Returns:
+        dict: 包含指數數據的字典
+    """
+    vol_future = None
     try:
-        # 取得日期
-        date = get_tw_stock_date('%Y%m%d')
         url = f"https://www.twse.com.tw/rwd/zh/afterTrading/MI_INDEX?date={date}&type=IND&response=html"
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+        # 成交金額頁面與指數頁面彼此獨立，先送出請求，在解析指數時同時下載
+        url_vol = f"https://www.twse.com.tw/rwd/zh/afterTrading/MI_INDEX?date={date}&type=MS&response=html"
+        vol_future = _EXECUTOR.submit(_SESSION.get, url_vol, timeout=TWSE_TIMEOUT)
         
-        response = requests.get(url, headers=headers)
+        response = _SESSION.get(url, timeout=TWSE_TIMEOUT)
         response.raise_for_status()
-        response.encoding = 'utf-8'
         
-        soup = BeautifulSoup(response.text, 'lxml')
+        # 依標頭編碼 (預設 UTF-8) 直接解析原始位元組，不經 response.text 偵測編碼與解碼，且只建立表格節點
+        soup = parse_html_response(response, parse_only=TABLE_STRAINER)
         
         # 取得加權指數
         tables = soup.find_all('table')
@@ -60,11 +119,11 @@ def get_taiex_data():
         change_value = safe_float(taiex_row[3].text.strip()) * change_sign
         change_percent = safe_float(taiex_row[4].text.strip()) * change_sign
         
-        # 獲取成交金額
-        url_vol = f"https://www.twse.com.tw/rwd/zh/afterTrading/MI_INDEX?date={date}&type=MS&response=html"
-        response_vol = requests.get(url_vol, headers=headers)
-        response_vol.encoding = 'utf-8'
-        soup_vol = BeautifulSoup(response_vol.text, 'lxml')
+        # 獲取成交金額 (錯誤頁面不當作數據解析)
+        response_vol = vol_future.result()
+        vol_future = None
+        response_vol.raise_for_status()
+        soup_vol = parse_html_response(response_vol, parse_only=TABLE_STRAINER)
         
         volume = 0.0
         # 找到總計行
@@ -89,13 +148,12 @@ def get_taiex_data():
     
     except Exception as e:
         logger.error(f"獲取台灣加權指數數據時出錯: {str(e)}")
-        return {
-            'date': get_tw_stock_date('%Y%m%d'),
-            'close': 0.0,
-            'change': 0.0,
-            'change_percent': 0.0,
-            'volume': 0.0
-        }
+        return {'date': date, **_TAIEX_DEFAULT}
+    
+    finally:
+        # 提前返回或出錯時，成交金額請求不再需要
+        if vol_future is not None:
+            _discard_response(vol_future)
 
 # 主程序測試
 if __name__ == "__main__":
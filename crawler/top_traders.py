@@ -3,15 +3,69 @@
 專門處理十大交易人和特定法人持倉資料
 """
 import logging
-import requests
 import re
-from bs4 import BeautifulSoup
+import lxml.etree
 from datetime import datetime
-from .utils import get_tw_stock_date, safe_int, get_html_content
+from types import MappingProxyType
+from .utils import get_tw_stock_date, safe_int, get_html_content, fetch_taifex_tree, ROWS_XPATH, CELLS_XPATH, format_query_date, TAIFEX_BASE_QUERY
 
 # 設定日誌
 logger = logging.getLogger(__name__)
 
+# 共用標頭已設定於 Session，本報表僅需指定 Referer
+_HEADERS = {'Referer': 'https://www.taifex.com.tw/cht/3/largeTraderFutQryTbl'}
+
+# 包含十大交易人資料的第一個表格
+_TRADERS_TABLE_XPATH = lxml.etree.XPath("(//table[contains(., '十大交易人') or contains(., '大額交易人')])[1]")
+
+# 預先編譯的數字比對樣式
+_NUMBER_RE = re.compile(r'\d[\d,]*')
+# 「十大交易人 (特定法人)」儲存格，一次比對取得括號外與括號內的數字
+_POSITION_CELL_RE = re.compile(r'(\d[\d,]*)(?:\s*\((\d[\d,]*)\))?')
+# 緊接在括號前的數字 (十大交易人部位)
+_OUTSIDE_PAREN_RE = re.compile(r'(\d[\d,]*)\s*\(')
+# 括號內的數字 (特定法人部位)
+_INSIDE_PAREN_RE = re.compile(r'\((\d[\d,]*)\)')
+
+def _parse_position_cell(text):
+    """
+    解析「十大交易人 (特定法人)」格式的儲存格
+    
+    Args:
+        text: 儲存格文字，例如 "45,678 (30,123)"
+        
+    Returns:
+        tuple: (十大交易人部位, 特定法人部位)，找不到的數值為 0
+    """
+    match = _POSITION_CELL_RE.search(text)
+    if not match:
+        return 0, 0
+    
+    traders, specific = match.groups()
+    if specific is None:
+        # 第一個數字後沒有括號，分別尋找括號外與括號內的數字
+        match = _OUTSIDE_PAREN_RE.search(text)
+        if match:
+            traders = match.group(1)
+        match = _INSIDE_PAREN_RE.search(text)
+        if match:
+            specific = match.group(1)
+    
+    return safe_int(traders), safe_int(specific)
+
+def _parse_first_number(text):
+    """
+    取出儲存格中的第一個數字
+    
+    Args:
+        text: 儲存格文字
+        
+    Returns:
+        int: 第一個數字，找不到時為 0
+    """
+    match = _NUMBER_RE.search(text)
+    return safe_int(match.group()) if match else 0
+
 def get_top_traders_data():
     """
     獲取十大交易人和特定法人持倉資料
@@ -27,7 +81,7 @@ def get_top_traders_data():
         result = get_top_traders_by_date(date)
         
         # 記錄結果
-        logger.info(f"十大交易人持倉資料: 十大交易人={result['top10_traders_net']}, 十大特定法人={result['top10_specific_net']}")
+        logger.info("十大交易人持倉資料: 十大交易人=%s, 十大特定法人=%s", result['top10_traders_net'], result['top10_specific_net'])
         
         return result
     
@@ -49,59 +103,35 @@ def get_top_traders_by_date(date):
         # 使用URL
         url = "https://www.taifex.com.tw/cht/3/largeTraderFutQryTbl"
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9',
-            'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Referer': 'https://www.taifex.com.tw/cht/3/largeTraderFutQryTbl'
-        }
-        
         # 使用POST方法，提供查詢參數
         data = {
-            'queryType': '1',
-            'goDay': '',
-            'doQuery': '1',
-            'dateaddcnt': '',
-            'queryDate': date[:4] + '/' + date[4:6] + '/' + date[6:],  # 格式化日期為YYYY/MM/DD
+            **TAIFEX_BASE_QUERY,
+            'queryDate': format_query_date(date),  # 格式化日期為YYYY/MM/DD
             'commodityId': 'TXF'  # 台指期貨
         }
         
         # 初始化結果
         result = default_top_traders_data()
         
-        # 請求數據
-        response = requests.post(url, headers=headers, data=data)
-        response.raise_for_status()
-        
-        # 嘗試使用不同的編碼
-        for encoding in ['utf-8', 'big5', 'cp950']:
-            try:
-                response.encoding = encoding
-                soup = BeautifulSoup(response.text, 'lxml')
-                break
-            except:
-                continue
+        # 請求數據 (與期貨爬蟲共用磁碟快取)，由 lxml 直接解析原始位元組，後續以預先編譯的 XPath 搜尋
+        tree = fetch_taifex_tree(url, _HEADERS, data, _TRADERS_TABLE_XPATH)
         
         # 查找表格
-        tables = soup.find_all('table')
-        if not tables:
+        if tree.find('.//table') is None:
             logger.error("找不到十大交易人持倉表格")
             return result
         
-        # 尋找包含十大交易人資料的表格
-        target_table = None
-        for table in tables:
-            if '十大交易人' in table.text or '大額交易人' in table.text:
-                target_table = table
-                break
+        # 尋找包含十大交易人資料的表格 (由 XPath 在 lxml 內比對表格文字)
+        tables = _TRADERS_TABLE_XPATH(tree)
+        target_table = tables[0] if tables else None
         
-        if not target_table:
+        if target_table is None:
             logger.error("找不到包含十大交易人資料的表格")
             return result
         
         # 解析表格資料
         # 針對表格結構尋找買方和賣方欄位
-        rows = target_table.find_all('tr')
+        rows = ROWS_XPATH(target_table)
         
         if len(rows) < 3:  # 需要至少有標題行和資料行
             logger.error("表格行數不足")
@@ -110,9 +140,9 @@ def get_top_traders_by_date(date):
         # 先找到標題行，建立欄位位置對應
         header_mapping = {}
         for i, row in enumerate(rows[:2]):  # 檢查前兩行，可能是多行標題
-            cols = row.find_all(['th', 'td'])
+            cols = CELLS_XPATH(row)
             for j, col in enumerate(cols):
-                text = col.text.strip().lower()
+                text = col.text_content().strip().lower()
                 
                 # 找買方欄位
                 if '買方' in text or '多方' in text:
@@ -128,7 +158,7 @@ def get_top_traders_by_date(date):
                     elif '特定法人' in text:
                         header_mapping['top10_specific_sell'] = j
         
-        logger.info(f"表頭映射: {header_mapping}")
+        logger.debug("表頭映射: %s", header_mapping)
         
         # 如果找不到特定法人欄位，可能是因為特定法人數據在括號中
         if 'top10_specific_buy' not in header_mapping and 'top10_traders_buy' in header_mapping:
@@ -140,8 +170,8 @@ def get_top_traders_by_date(date):
         # 尋找包含台指期貨資料的行
         data_row = None
         for row in rows[2:]:  # 跳過標題行
-            cols = row.find_all(['th', 'td'])
-            row_text = ' '.join([col.text.strip() for col in cols])
+            cols = CELLS_XPATH(row)
+            row_text = ' '.join([col.text_content().strip() for col in cols])
             
             # 檢查是否為台指期貨行
             if '臺股期貨' in row_text or 'TX' in row_text:
@@ -162,57 +192,29 @@ def get_top_traders_by_date(date):
             # 提取十大交易人買方部位
             if 'top10_traders_buy' in header_mapping:
                 buy_col = data_row[header_mapping['top10_traders_buy']]
-                buy_text = buy_col.text.strip()
+                buy_text = buy_col.text_content().strip()
                 
-                # 提取數字，可能包含在括號外
-                match = re.search(r'(\d+[\d,]*)\s*\(', buy_text)
-                if match:
-                    top10_traders_buy = safe_int(match.group(1).replace(',', ''))
-                else:
-                    # 如果沒有括號，直接取數字
-                    numbers = re.findall(r'\d+[\d,]*', buy_text)
-                    if numbers:
-                        top10_traders_buy = safe_int(numbers[0].replace(',', ''))
-                
-                # 提取特定法人買方部位（可能在括號內）
-                match = re.search(r'\((\d+[\d,]*)\)', buy_text)
-                if match:
-                    top10_specific_buy = safe_int(match.group(1).replace(',', ''))
+                # 括號外為十大交易人部位，括號內為特定法人部位
+                top10_traders_buy, top10_specific_buy = _parse_position_cell(buy_text)
             
             # 提取十大交易人賣方部位
             if 'top10_traders_sell' in header_mapping:
                 sell_col = data_row[header_mapping['top10_traders_sell']]
-                sell_text = sell_col.text.strip()
-                
-                # 提取數字，可能包含在括號外
-                match = re.search(r'(\d+[\d,]*)\s*\(', sell_text)
-                if match:
-                    top10_traders_sell = safe_int(match.group(1).replace(',', ''))
-                else:
-                    # 如果沒有括號，直接取數字
-                    numbers = re.findall(r'\d+[\d,]*', sell_text)
-                    if numbers:
-                        top10_traders_sell = safe_int(numbers[0].replace(',', ''))
+                sell_text = sell_col.text_content().strip()
                 
-                # 提取特定法人賣方部位（可能在括號內）
-                match = re.search(r'\((\d+[\d,]*)\)', sell_text)
-                if match:
-                    top10_specific_sell = safe_int(match.group(1).replace(',', ''))
+                # 括號外為十大交易人部位，括號內為特定法人部位
+                top10_traders_sell, top10_specific_sell = _parse_position_cell(sell_text)
             
             # 如果以上方法沒有找到特定法人數據，嘗試從專門的特定法人欄位獲取
             if top10_specific_buy == 0 and 'top10_specific_buy' in header_mapping and header_mapping['top10_specific_buy'] != header_mapping.get('top10_traders_buy', -1):
                 specific_buy_col = data_row[header_mapping['top10_specific_buy']]
-                specific_buy_text = specific_buy_col.text.strip()
-                numbers = re.findall(r'\d+[\d,]*', specific_buy_text)
-                if numbers:
-                    top10_specific_buy = safe_int(numbers[0].replace(',', ''))
+                specific_buy_text = specific_buy_col.text_content().strip()
+                top10_specific_buy = _parse_first_number(specific_buy_text)
             
             if top10_specific_sell == 0 and 'top10_specific_sell' in header_mapping and header_mapping['top10_specific_sell'] != header_mapping.get('top10_traders_sell', -1):
                 specific_sell_col = data_row[header_mapping['top10_specific_sell']]
-                specific_sell_text = specific_sell_col.text.strip()
-                numbers = re.findall(r'\d+[\d,]*', specific_sell_text)
-                if numbers:
-                    top10_specific_sell = safe_int(numbers[0].replace(',', ''))
+                specific_sell_text = specific_sell_col.text_content().strip()
+                top10_specific_sell = _parse_first_number(specific_sell_text)
             
             # 計算淨部位
             top10_traders_net = top10_traders_buy - top10_traders_sell
@@ -226,8 +228,8 @@ def get_top_traders_by_date(date):
             result['top10_specific_sell'] = top10_specific_sell
             result['top10_specific_net'] = top10_specific_net
             
-            logger.info(f"十大交易人: 買方={top10_traders_buy}, 賣方={top10_traders_sell}, 淨部位={top10_traders_net}")
-            logger.info(f"十大特定法人: 買方={top10_specific_buy}, 賣方={top10_specific_sell}, 淨部位={top10_specific_net}")
+            logger.debug("十大交易人: 買方=%s, 賣方=%s, 淨部位=%s", top10_traders_buy, top10_traders_sell, top10_traders_net)
+            logger.debug("十大特定法人: 買方=%s, 賣方=%s, 淨部位=%s", top10_specific_buy, top10_specific_sell, top10_specific_net)
             
         except Exception as e:
             logger.error(f"解析十大交易人資料時出錯: {str(e)}")
@@ -238,16 +240,19 @@ def get_top_traders_by_date(date):
         logger.error(f"獲取十大交易人持倉資料時出錯: {str(e)}")
         return default_top_traders_data()
 
+# 預設資料的共用範本 (唯讀)，預設函數只需淺複製 (值皆為不可變型別)
+_TOP_TRADERS_DEFAULT = MappingProxyType({
+    'top10_traders_buy': 0,
+    'top10_traders_sell': 0,
+    'top10_traders_net': 0,
+    'top10_specific_buy': 0,
+    'top10_specific_sell': 0,
+    'top10_specific_net': 0
+})
+
 def default_top_traders_data():
     """返回默認的十大交易人和特定法人持倉資料"""
-    return {
-        'top10_traders_buy': 0,
-        'top10_traders_sell': 0,
-        'top10_traders_net': 0,
-        'top10_specific_buy': 0,
-        'top10_specific_sell': 0,
-        'top10_specific_net': 0
-    }
+    return _TOP_TRADERS_DEFAULT.copy()
 
 # 主程序測試
 if __name__ == "__main__":
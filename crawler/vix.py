@@ -4,11 +4,15 @@ VIX指標爬蟲模組
 import re
 import logging
 from datetime import datetime, timedelta
-import requests
-from .utils import get_tw_stock_date
+from .utils import get_tw_stock_date, get_response_encoding, taifex_get
 
 logger = logging.getLogger(__name__)
 
+# 預先編譯的VIX數值比對樣式：最後一分鐘平均值、任意浮點數、行尾浮點數
+_LAST_MIN_AVG_RE = re.compile(r"Last 1 min AVG\s+(\d+\.\d+)")
+_FLOAT_RE = re.compile(r"\d+\.\d+")
+_TRAILING_FLOAT_RE = re.compile(r"(\d+\.\d+)$")
+
 def get_vix_data():
     """
     獲取VIX指標數據，返回最後一分鐘平均值
@@ -20,24 +24,17 @@ def get_vix_data():
         # 取得日期
         date = get_tw_stock_date('%Y%m%d')
         
-        # 構建URL
-        url = f"https://www.taifex.com.tw/cht/7/getVixData?filesname={date}"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()  # 檢查是否有HTTP錯誤
+        # 下載並解碼一次，檢查與解析共用同一份文字，不必再次下載
+        text = _fetch_vix_text(date)
         
         # 檢查是否有數據
-        if "無資料" in response.text or len(response.text.strip()) == 0:
+        if "無資料" in text or len(text.strip()) == 0:
             # 可能是非交易日，嘗試獲取前一天的數據
             logger.warning(f"無法獲取 {date} 的VIX數據，可能是非交易日")
             yesterday = (datetime.strptime(date, '%Y%m%d') - timedelta(days=1)).strftime('%Y%m%d')
             return get_vix_data_by_date(yesterday)
         
-        return get_vix_data_by_date(date)
+        return _parse_vix_text(text, date)
     
     except Exception as e:
         logger.error(f"獲取VIX數據時出錯: {str(e)}")
@@ -54,54 +51,65 @@ def get_vix_data_by_date(date):
         float: 收盤VIX值（最後一分鐘平均值）
     """
     try:
-        url = f"https://www.taifex.com.tw/cht/7/getVixData?filesname={date}"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        
-        # 嘗試不同的編碼
-        encodings = ['utf-8', 'big5', 'cp950', 'latin-1']
-        
-        for encoding in encodings:
-            try:
-                decoded_text = response.content.decode(encoding)
-                
-                # 直接查找最後一分鐘平均值
-                last_min_avg_pattern = r"Last 1 min AVG\s+(\d+\.\d+)"
-                match = re.search(last_min_avg_pattern, decoded_text)
-                
-                if match:
-                    return float(match.group(1))
-                
-                # 如果找不到特定模式，則解析整個文件並取最後一個非空值
-                lines = decoded_text.split('\n')
-                for line in reversed(lines):
-                    if "AVG" in line and re.search(r"\d+\.\d+", line):
-                        value_match = re.search(r"(\d+\.\d+)$", line.strip())
-                        if value_match:
-                            return float(value_match.group(1))
-                
-                # 最後嘗試：查找任何浮點數
-                for line in reversed(lines):
-                    float_match = re.search(r"(\d+\.\d+)$", line.strip())
-                    if float_match:
-                        return float(float_match.group(1))
-                
-            except UnicodeDecodeError:
-                continue
-        
-        # 如果所有嘗試都失敗，則返回0
-        logger.error(f"無法解析 {date} 的VIX數據")
-        return 0.0
+        return _parse_vix_text(_fetch_vix_text(date), date)
     
     except Exception as e:
         logger.error(f"獲取 {date} 的VIX數據時出錯: {str(e)}")
         return 0.0
 
+def _fetch_vix_text(date):
+    """
+    下載特定日期的VIX資料檔並解碼為文字
+    
+    Args:
+        date: 日期字符串，格式為YYYYMMDD
+        
+    Returns:
+        str: 資料檔內容
+    """
+    url = f"https://www.taifex.com.tw/cht/7/getVixData?filesname={date}"
+    
+    # 經由斷路器送出請求 (共用標頭已設定於 Session，並已檢查 HTTP 錯誤)
+    response = taifex_get(url)
+    
+    # 依回應標頭宣告的編碼 (未指定時為 UTF-8) 只解碼一次，「無資料」等中文訊息才能正確比對
+    return response.content.decode(get_response_encoding(response), errors='replace')
+
+def _parse_vix_text(decoded_text, date):
+    """
+    從VIX資料檔內容取出最後一分鐘平均值
+    
+    Args:
+        decoded_text: 資料檔內容
+        date: 日期字符串，格式為YYYYMMDD (僅用於日誌)
+        
+    Returns:
+        float: 收盤VIX值，找不到時返回 0.0
+    """
+    # 直接查找最後一分鐘平均值
+    match = _LAST_MIN_AVG_RE.search(decoded_text)
+    
+    if match:
+        return float(match.group(1))
+    
+    # 如果找不到特定模式，則解析整個文件並取最後一個非空值
+    lines = decoded_text.split('\n')
+    for line in reversed(lines):
+        if "AVG" in line and _FLOAT_RE.search(line):
+            value_match = _TRAILING_FLOAT_RE.search(line.strip())
+            if value_match:
+                return float(value_match.group(1))
+    
+    # 最後嘗試：查找任何浮點數
+    for line in reversed(lines):
+        float_match = _TRAILING_FLOAT_RE.search(line.strip())
+        if float_match:
+            return float(float_match.group(1))
+    
+    # 如果找不到任何數值，則返回0
+    logger.error(f"無法解析 {date} 的VIX數據")
+    return 0.0
+
 # 主程序測試
 if __name__ == "__main__":
     result = get_vix_data()
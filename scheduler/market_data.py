@@ -5,15 +5,19 @@ import os
 import logging
 import random
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import schedule
 import threading
 import pytz
 from linebot.models import TextSendMessage
 
-from crawler.taiex import get_taiex_data
+from crawler.taiex import get_taiex_data, clear_taiex_cache
 # 移除原本的 futures 引入
 # from crawler.futures import get_futures_data
+# 僅引入期貨數據快取的清除函數
+from crawler.futures import clear_futures_cache
+from crawler.utils import is_tw_trading_day
 # 新增引入三大法人期貨持倉模組
 from crawler.institutional_futures import get_institutional_futures_data
 from crawler.institutional import get_institutional_investors_data
@@ -36,6 +40,9 @@ logger = logging.getLogger(__name__)
 # 設定台灣時區
 TW_TIMEZONE = pytz.timezone('Asia/Taipei')
 
+# 同時爬取市場數據的執行緒數量（對應 fetch_market_data 的數據來源數）
+_FETCH_WORKERS = 7
+
 def fetch_market_data():
     """
     爬取所有市場數據並存入資料庫
@@ -43,37 +50,47 @@ def fetch_market_data():
     try:
         logger.info("開始獲取市場數據...")
         
+        # 各數據來源彼此獨立且皆為網路 I/O，同時送出請求以縮短總等待時間
+        with ThreadPoolExecutor(max_workers=_FETCH_WORKERS) as executor:
+            taiex_future = executor.submit(get_taiex_data)
+            institutional_future = executor.submit(get_institutional_investors_data)
+            pc_ratio_future = executor.submit(get_pc_ratio)
+            vix_future = executor.submit(get_vix_data)
+            top_traders_future = executor.submit(get_top_traders_data)
+            option_positions_future = executor.submit(get_option_positions_data)
+            institutional_futures_future = executor.submit(get_institutional_futures_data)
+        
         # 獲取加權指數數據
-        taiex_data = get_taiex_data()
-        logger.info(f"獲取加權指數數據: {taiex_data}")
+        taiex_data = taiex_future.result()
+        logger.info("獲取加權指數數據: %s", taiex_data)
         
         # 移除原本的期貨數據獲取
         # futures_data = get_futures_data()
         # logger.info(f"獲取期貨數據: {futures_data}")
         
         # 獲取三大法人數據
-        institutional_data = get_institutional_investors_data()
-        logger.info(f"獲取三大法人數據: {institutional_data}")
+        institutional_data = institutional_future.result()
+        logger.info("獲取三大法人數據: %s", institutional_data)
         
         # 獲取PC Ratio數據
-        pc_ratio_data = get_pc_ratio()
-        logger.info(f"獲取PC Ratio數據: {pc_ratio_data}")
+        pc_ratio_data = pc_ratio_future.result()
+        logger.info("獲取PC Ratio數據: %s", pc_ratio_data)
         
         # 獲取VIX指標數據
-        vix_data = get_vix_data()
-        logger.info(f"獲取VIX指標數據: {vix_data}")
+        vix_data = vix_future.result()
+        logger.info("獲取VIX指標數據: %s", vix_data)
         
         # 獲取十大交易人和特定法人持倉數據
-        top_traders_data = get_top_traders_data()
-        logger.info(f"獲取十大交易人數據: {top_traders_data}")
+        top_traders_data = top_traders_future.result()
+        logger.info("獲取十大交易人數據: %s", top_traders_data)
         
         # 獲取選擇權持倉數據
-        option_positions_data = get_option_positions_data()
-        logger.info(f"獲取選擇權持倉數據: {option_positions_data}")
+        option_positions_data = option_positions_future.result()
+        logger.info("獲取選擇權持倉數據: %s", option_positions_data)
         
         # 新增：獲取三大法人期貨持倉數據
-        institutional_futures_data = get_institutional_futures_data()
-        logger.info(f"獲取三大法人期貨持倉數據: {institutional_futures_data}")
+        institutional_futures_data = institutional_futures_future.result()
+        logger.info("獲取三大法人期貨持倉數據: %s", institutional_futures_data)
         
         # 計算散戶指標
         # 修改為使用新的三大法人期貨持倉數據
@@ -267,8 +284,8 @@ def delayed_fetch_and_push(line_bot_api, minutes=0, seconds=0):
         
         # 檢查今天是否是交易日
         now = datetime.now(TW_TIMEZONE)
-        if now.weekday() >= 5:  # 週末不爬取
-            logger.info("今天是週末，不爬取市場數據")
+        if not is_tw_trading_day(now.strftime('%Y%m%d')):  # 週末與休市日不爬取
+            logger.info("今天不是交易日，不爬取市場數據")
             return
         
         # 爬取市場數據
@@ -285,7 +302,8 @@ def delayed_fetch_and_push(line_bot_api, minutes=0, seconds=0):
 def clean_cache():
     """清除過期的快取數據"""
     logger.info("清除過期的快取數據")
-    # 在這裡實現清除快取的邏輯
+    clear_futures_cache()
+    clear_taiex_cache()
 
 def run_scheduler(line_bot_api):
     """